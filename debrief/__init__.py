@@ -0,0 +1 @@
+"""Shared loading and analysis helpers for the Data debrief pages."""
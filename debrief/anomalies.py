@@ -0,0 +1,203 @@
+"""Online detection of posts and profiles whose engagement deviates sharply.
+
+Per Profil the detector keeps an exponentially weighted mean and variance of
+the log of likes, comments and Post-Interaktionsrate, stored in
+``CACHE_DIR/anomalies.npz`` with the Beitrag-IDs it has already seen. During
+ingest, the posts of a new snapshot that were not seen before are scored in
+order of their Datum against their profile's statistics so far, and then
+update them. Scoring and updating a post is O(1), however long the history.
+
+A post is flagged when a metric is ``DEBRIEF_ANOMALY_THRESHOLD`` standard
+deviations or more from its profile's running mean, after the profile has
+``DEBRIEF_ANOMALY_MIN_HISTORY`` posts. A profile is flagged when the new posts
+of a snapshot deviate together: their mean score, times the square root of
+their number, passes the same threshold. Flags are appended to
+``CACHE_DIR/anomaly-flags.parquet``, so they survive a restart, when the
+snapshot's posts are already in the state.
+
+Several server processes may ingest the same export. Loading the state,
+scoring, appending the flags and saving the state run under a file lock, on
+the state as last saved by any of them, so every post is scored once.
+"""
+import contextlib
+import fcntl
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+from debrief import config
+
+METRICS = ['Anzahl Likes', 'Anzahl Kommentare', 'Post-Interaktionsrate']
+# Added before taking the log, so zero likes or a zero rate stay finite
+FLOORS = np.array([1, 1, 1e-4])
+FLAG_COLUMNS = ['snapshot', 'kind', 'Profil', 'Beitrag-ID', 'Datum', 'metric', 'value', 'expected', 'score', 'posts']
+
+_lock = threading.Lock()
+
+
+def _state_path():
+    return os.path.join(config.CACHE_DIR, 'anomalies.npz')
+
+
+def _flags_path():
+    return os.path.join(config.CACHE_DIR, 'anomaly-flags.parquet')
+
+
+@contextlib.contextmanager
+def _locked():
+    os.makedirs(config.CACHE_DIR, exist_ok=True)
+    with _lock, open(os.path.join(config.CACHE_DIR, 'anomalies.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def post_keys(beitrag_ids):
+    return pd.util.hash_array(np.asarray(beitrag_ids, dtype=str).astype(object))
+
+
+class EngagementState:
+    """EWMA mean and variance of the log metrics per Profil, and the posts already counted."""
+
+    def __init__(self, profiles=None, counts=None, means=None, variances=None, seen=None):
+        self.profiles = [] if profiles is None else list(profiles)
+        self._positions = {profile: position for position, profile in enumerate(self.profiles)}
+        self.counts = list(np.zeros(0, dtype=np.int64) if counts is None else counts)
+        self.means = [row for row in (np.zeros((0, len(METRICS))) if means is None else means)]
+        self.variances = [row for row in (np.zeros((0, len(METRICS))) if variances is None else variances)]
+        self.seen = set() if seen is None else set(seen.tolist())
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path, allow_pickle=False) as stored:
+                return cls(stored['profiles'].tolist(), stored['counts'], stored['means'], stored['variances'],
+                           stored['seen'])
+        except (OSError, KeyError, ValueError):
+            return cls()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Other server processes may read it at the same time; replace it whole
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez(f, profiles=np.asarray(self.profiles, dtype=str),
+                     counts=np.asarray(self.counts, dtype=np.int64),
+                     means=np.asarray(self.means).reshape(-1, len(METRICS)),
+                     variances=np.asarray(self.variances).reshape(-1, len(METRICS)),
+                     seen=np.fromiter(self.seen, dtype=np.uint64, count=len(self.seen)))
+        os.replace(f"{path}.tmp", path)
+
+    def _position(self, profile):
+        position = self._positions.get(profile)
+        if position is None:
+            position = self._positions[profile] = len(self.profiles)
+            self.profiles.append(profile)
+            self.counts.append(0)
+            self.means.append(np.zeros(len(METRICS)))
+            self.variances.append(np.zeros(len(METRICS)))
+        return position
+
+    def observe(self, profile, values, alpha, min_history):
+        """Score ``values`` (log metrics of one post) against ``profile``, then update it.
+
+        Returns the scores, NaN while the profile has fewer than ``min_history`` posts,
+        and the expected values.
+        """
+        position = self._position(profile)
+        mean, variance, count = self.means[position], self.variances[position], self.counts[position]
+        present = ~np.isnan(values)
+        expected = mean.copy()
+        if count >= min_history:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                scores = np.where(present, (values - mean) / np.sqrt(variance), np.nan)
+            scores[present & (variance == 0)] = 0
+        else:
+            scores = np.full(len(METRICS), np.nan)
+        if count == 0:
+            # The first post starts the mean; there is no spread yet
+            mean[present] = values[present]
+        else:
+            difference = np.where(present, values - mean, 0)
+            increment = alpha * difference
+            mean += increment
+            variance[:] = (1 - alpha) * (variance + difference * increment)
+        self.counts[position] = count + 1
+        return scores, expected
+
+
+def _log_metrics(frame):
+    values = frame[METRICS].to_numpy(dtype=np.float64)
+    # Counts and rates are heavy-tailed; a viral post is many times, not many units, above the usual
+    return np.log(np.clip(values, 0, None) + FLOORS)
+
+
+def detect(state, snapshot, alpha=None, threshold=None, min_history=None):
+    """Score the posts of ``snapshot`` that ``state`` has not seen; returns the new flags."""
+    alpha = config.ANOMALY_ALPHA if alpha is None else alpha
+    threshold = config.ANOMALY_THRESHOLD if threshold is None else threshold
+    min_history = config.ANOMALY_MIN_HISTORY if min_history is None else min_history
+
+    data = snapshot.data
+    keys = post_keys(data['Beitrag-ID'])
+    new = np.fromiter((key not in state.seen for key in keys.tolist()), dtype=bool, count=len(keys))
+    posts = data[new].assign(key=keys[new]).sort_values('Datum', kind='stable')
+    values = _log_metrics(posts)
+
+    flags, profile_scores = [], {}
+    for (profile, beitrag_id, datum, key), row in zip(
+            posts[['Profil', 'Beitrag-ID', 'Datum', 'key']].itertuples(index=False, name=None), values):
+        state.seen.add(key)
+        if pd.isna(profile):
+            continue
+        scores, expected = state.observe(profile, row, alpha, min_history)
+        if np.isnan(scores).all():
+            continue
+        profile_scores.setdefault(profile, []).append(scores)
+        for metric, floor, value, mean, score in zip(METRICS, FLOORS, row, expected, scores):
+            if abs(score) >= threshold:
+                flags.append((snapshot.version, 'post', profile, str(beitrag_id), datum, metric,
+                              np.exp(value) - floor, np.exp(mean) - floor, score, 1))
+
+    for profile, scores in profile_scores.items():
+        scores = np.asarray(scores)
+        count = np.sum(~np.isnan(scores), axis=0)
+        # The mean score of n posts times sqrt(n), a standard score again
+        combined = np.nansum(scores, axis=0) / np.sqrt(np.maximum(count, 1))
+        for metric, score, posts_scored in zip(METRICS, combined, count):
+            if posts_scored > 1 and abs(score) >= threshold:
+                flags.append((snapshot.version, 'profile', profile, None, None, metric,
+                              np.nan, np.nan, score, int(posts_scored)))
+    return pd.DataFrame(flags, columns=FLAG_COLUMNS)
+
+
+def read_flags():
+    """All flags raised so far, newest snapshot last."""
+    try:
+        return pd.read_parquet(_flags_path())
+    except (OSError, ValueError):
+        return pd.DataFrame(columns=FLAG_COLUMNS)
+
+
+def _append_flags(flags):
+    path = _flags_path()
+    flags = pd.concat([frame for frame in (read_flags(), flags) if not frame.empty], ignore_index=True)
+    # Beitrag-IDs are numbers in some exports and strings in others
+    flags.astype({'Profil': 'string', 'Beitrag-ID': 'string', 'Datum': 'datetime64[ns]'}).to_parquet(
+        f"{path}.tmp", index=False)
+    os.replace(f"{path}.tmp", path)
+
+
+def index_snapshot(snapshot):
+    """Ingest hook: score the new posts of ``snapshot`` and persist the flags and state."""
+    with _locked():
+        state = EngagementState.load(_state_path())
+        flags = detect(state, snapshot)
+        # The flags first: if appending them fails, the posts are not marked as seen and are scored again
+        if not flags.empty:
+            _append_flags(flags)
+        state.save(_state_path())
+    return flags
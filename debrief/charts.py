@@ -0,0 +1,140 @@
+"""Plotly figures for the pages, switched to WebGL when large and sent from a spec cache.
+
+Builders return plain figures and turn their scatter traces into ``Scattergl``
+once a chart has more than ``config.WEBGL_THRESHOLD`` points, so long time ranges
+and per-Gruppe overlays stay smooth in the browser. ``plotly_chart`` keeps the
+serialised figure JSON per ``(chart, filter hash, dataset version)`` for every
+session on the server; an unchanged chart is sent without building or
+serialising the figure again. Sending a cached spec uses Streamlit internals,
+so it is only tried on the Streamlit release it was written for
+(``requirements.txt`` pins it); any other goes through ``st.plotly_chart``.
+"""
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from debrief import config
+
+MAX_SPECS = 128
+# The Streamlit release whose PlotlyChart proto and widget ids _enqueue_spec mirrors
+ENQUEUE_STREAMLIT = '1.35.'
+
+_specs = OrderedDict()
+_specs_lock = threading.Lock()
+
+
+def filter_hash(*state):
+    """Stable hash of the sidebar state, e.g. ``filter_hash(filters, phrase)``."""
+    return hashlib.sha1(json.dumps(state, sort_keys=True, default=str).encode()).hexdigest()[:16]
+
+
+def _point_count(figure):
+    return sum(len(trace.x) for trace in figure.data if getattr(trace, 'x', None) is not None)
+
+
+def use_webgl(figure, threshold=None):
+    """Replace the SVG scatter traces of ``figure`` by WebGL ones if it has many points."""
+    threshold = config.WEBGL_THRESHOLD if threshold is None else threshold
+    if _point_count(figure) <= threshold:
+        return figure
+    traces = []
+    for trace in figure.data:
+        if trace.type == 'scatter':
+            spec = trace.to_plotly_json()
+            spec.pop('type')
+            # Keeps the trace's axes, so secondary y axes survive the swap
+            trace = go.Scattergl(spec, skip_invalid=True)
+        traces.append(trace)
+    return go.Figure(data=traces, layout=figure.layout)
+
+
+def line(data, x, y, title, labels, color=None):
+    # px's own 'auto' mode uses a fixed threshold; decide here so all charts agree
+    figure = px.line(data, x=x, y=y, color=color, title=title, labels=labels, render_mode='svg')
+    return use_webgl(figure)
+
+
+def dual_axis(data, x, left, right, title, x_title):
+    """Two series over ``x`` on separate y axes; ``left``/``right`` are ``(column, name, color, axis title)``."""
+    figure = make_subplots(specs=[[{"secondary_y": True}]])
+    for (column, name, color, _), secondary_y in [(left, False), (right, True)]:
+        figure.add_trace(
+            go.Scatter(x=data[x], y=data[column], name=name, mode="lines",
+                       line=dict(color=color, width=2), opacity=0.8),
+            secondary_y=secondary_y
+        )
+    figure.update_layout(title_text=title, xaxis_title=x_title, legend=dict(orientation="h", x=0, y=-0.2))
+    figure.update_yaxes(title_text=left[3], secondary_y=False)
+    figure.update_yaxes(title_text=right[3], secondary_y=True)
+    return use_webgl(figure)
+
+
+def bar(data, x, y, title, labels, color=None):
+    return px.bar(data, x=x, y=y, title=title, labels=labels, color=color)
+
+
+def heatmap(matrix, title, labels):
+    """``matrix`` (a square frame) as a heatmap, with its index on both axes."""
+    return px.imshow(matrix, title=title, labels=labels, color_continuous_scale='Blues', aspect='auto')
+
+
+def cached_spec(chart, key, build):
+    """Serialised JSON of ``build()``, built once per ``(chart, key)``."""
+    cache_key = (chart, key)
+    with _specs_lock:
+        if cache_key in _specs:
+            _specs.move_to_end(cache_key)
+            return _specs[cache_key]
+    spec = pio.to_json(build(), validate=False)
+    with _specs_lock:
+        _specs[cache_key] = spec
+        while len(_specs) > MAX_SPECS:
+            _specs.popitem(last=False)
+    return spec
+
+
+def _enqueue_spec(spec, use_container_width):
+    # What st.plotly_chart does after serialising the figure, for charts without selections
+    from streamlit.elements.form import current_form_id
+    from streamlit.proto.PlotlyChart_pb2 import PlotlyChart as PlotlyChartProto
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    from streamlit.runtime.state.common import compute_widget_id
+
+    proto = PlotlyChartProto()
+    proto.use_container_width = use_container_width
+    proto.theme = 'streamlit'
+    proto.form_id = current_form_id(st._main)
+    proto.spec = spec
+    proto.config = json.dumps({'showLink': False, 'linkText': False})
+    ctx = get_script_run_ctx()
+    proto.id = compute_widget_id(
+        "plotly_chart", user_key=None, key=None, plotly_spec=proto.spec, plotly_config=proto.config,
+        selection_mode=('points', 'box', 'lasso'), is_selection_activated=False, theme='streamlit',
+        form_id=proto.form_id, use_container_width=use_container_width,
+        page=ctx.page_script_hash if ctx else None,
+    )
+    st._main._enqueue("plotly_chart", proto)
+
+
+def plotly_chart(chart, key, build, use_container_width=True):
+    """Show the figure ``build()`` returns, from the spec cache when ``key`` was seen before.
+
+    ``key`` must change whenever the figure would, e.g.
+    ``(filter_hash(filters, phrase), snapshot.version)``.
+    """
+    spec = cached_spec(chart, key, build)
+    if st.__version__.startswith(ENQUEUE_STREAMLIT):
+        try:
+            _enqueue_spec(spec, use_container_width)
+            return
+        except Exception:
+            # Streamlit moved or changed its internals; nothing was sent yet
+            pass
+    st.plotly_chart(pio.from_json(spec), use_container_width=use_container_width)
@@ -0,0 +1,200 @@
+"""Sentiment, emotion and politikfeld labels for the posts, cached by post text.
+
+The exports come with labels (with stray quoting). A classifier can replace them
+during ingest: it gets batches of posts (a frame with ``Text`` and the export's
+columns) and returns the three label columns for them. Its results are kept in
+an SQLite table keyed by the classifier's name and a hash of ``Text``, so a new
+weekly snapshot only classifies posts that are new or were edited. Labels are
+normalised before they are stored or returned; the pages use them as they are.
+
+A classifier is any object with a ``name``, a ``cacheable`` flag and a
+``classify(posts)`` method; ``DEBRIEF_CLASSIFIER=package.module:attribute``
+plugs one in.
+"""
+import contextlib
+import importlib
+import json
+import os
+import re
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+from debrief import config
+
+LABEL_COLUMNS = ['sentiment', 'emotion', 'politikfeld']
+
+# Label -> keywords for each dimension, plus the label of posts without any match
+DEFAULT_LEXICON = {
+    'sentiment': {
+        'default': 'neutral',
+        'labels': {
+            'positive': ['danke', 'freue', 'freuen', 'toll', 'großartig', 'stark', 'gemeinsam', 'zukunft',
+                         'gewonnen', 'erfolg', 'mut', 'hoffnung'],
+            'negative': ['skandal', 'versagt', 'versagen', 'gefährlich', 'katastrophe', 'schlecht', 'angst',
+                         'wut', 'leider', 'verloren', 'chaos', 'lüge'],
+        },
+    },
+    'emotion': {
+        'default': 'neutral',
+        'labels': {
+            'joy': ['freue', 'freuen', 'glücklich', 'toll', 'feiern', 'danke', 'großartig'],
+            'anger': ['wut', 'wütend', 'skandal', 'unverschämt', 'empörend', 'frechheit'],
+            'sadness': ['traurig', 'trauer', 'leider', 'verloren', 'gedenken'],
+            'fear': ['angst', 'gefahr', 'gefährlich', 'bedrohung', 'sorge'],
+            'disgust': ['widerlich', 'ekelhaft', 'abscheulich'],
+            'surprise': ['überraschend', 'unglaublich', 'plötzlich'],
+        },
+    },
+    'politikfeld': {
+        'default': 'sonstiges',
+        'labels': {
+            'events und aktionen': ['veranstaltung', 'infostand', 'wahlkampfstand', 'kundgebung', 'demo',
+                                    'termin', 'kommt vorbei', 'live'],
+            'wirtschaft': ['wirtschaft', 'unternehmen', 'industrie', 'arbeitsplätze', 'mittelstand', 'inflation'],
+            'gesellschaft': ['gesellschaft', 'demokratie', 'vielfalt', 'gleichberechtigung', 'zusammenhalt'],
+            'sozialpolitik': ['rente', 'bürgergeld', 'mindestlohn', 'pflege', 'wohnen', 'miete', 'sozial'],
+            'migration': ['migration', 'asyl', 'geflüchtete', 'flüchtlinge', 'einwanderung', 'grenze'],
+            'außenpolitik': ['ukraine', 'russland', 'israel', 'nato', 'außenpolitik', 'usa', 'china'],
+            'sicherheit': ['polizei', 'sicherheit', 'kriminalität', 'anschlag', 'bundeswehr', 'terror'],
+            'klimaschutz': ['klima', 'klimaschutz', 'erneuerbare', 'energiewende', 'co2', 'umwelt'],
+            'bildung': ['bildung', 'schule', 'schulen', 'kita', 'lehrkräfte', 'universität', 'studium'],
+            'europa': ['europa', 'eu', 'europäisch', 'europäische', 'brüssel'],
+            'staatliche finanzen': ['haushalt', 'schuldenbremse', 'steuern', 'schulden', 'finanzen'],
+            'gesundheit': ['gesundheit', 'krankenhaus', 'ärzte', 'krankenkasse'],
+        },
+    },
+}
+
+
+def normalize_labels(labels):
+    """Strip stray quotes and whitespace and lowercase every label column."""
+    return labels.apply(lambda column: column.str.strip(" '\"").str.lower())
+
+
+def text_hashes(texts):
+    """Stable 64-bit hashes of ``texts``, computed in one vectorised pass."""
+    return pd.util.hash_pandas_object(texts.fillna(''), index=False).to_numpy().view(np.int64)
+
+
+class ExportLabels:
+    """Keeps the labels that come with the export; nothing to classify or cache."""
+
+    name = 'export'
+    cacheable = False
+
+    def classify(self, posts):
+        return posts[LABEL_COLUMNS]
+
+
+class LexiconClassifier:
+    """Picks, per dimension, the label whose keywords occur most often in ``Text``."""
+
+    cacheable = True
+
+    def __init__(self, lexicon=None):
+        self.lexicon = lexicon or DEFAULT_LEXICON
+        digest = pd.util.hash_pandas_object(pd.Series([json.dumps(self.lexicon, sort_keys=True)]),
+                                            index=False).iloc[0]
+        # Editing the lexicon invalidates what it labelled before
+        self.name = f"lexicon-{digest:016x}"
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def classify(self, posts):
+        texts = posts['Text'].fillna('').str.lower()
+        labels = {}
+        for dimension, spec in self.lexicon.items():
+            names = list(spec['labels'])
+            counts = np.column_stack([
+                texts.str.count(r'\b(?:' + '|'.join(map(re.escape, spec['labels'][name])) + r')\b').to_numpy()
+                for name in names
+            ])
+            best = np.asarray(names, dtype=object)[counts.argmax(axis=1)]
+            labels[dimension] = np.where(counts.max(axis=1) > 0, best, spec['default'])
+        return pd.DataFrame(labels, index=posts.index, columns=LABEL_COLUMNS)
+
+
+def get_classifier(name=None):
+    name = name or config.CLASSIFIER
+    if name == 'export':
+        return ExportLabels()
+    if name == 'lexicon':
+        return LexiconClassifier.from_file(config.LEXICON) if config.LEXICON else LexiconClassifier()
+    module, _, attribute = name.partition(':')
+    factory = getattr(importlib.import_module(module), attribute)
+    return factory()
+
+
+class LabelCache:
+    """Labels per ``(classifier, text hash)`` in an SQLite table."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(config.CACHE_DIR, 'labels.sqlite')
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS labels (classifier TEXT, text_hash INTEGER, sentiment TEXT, "
+                "emotion TEXT, politikfeld TEXT, PRIMARY KEY (classifier, text_hash)) WITHOUT ROWID"
+            )
+
+    @contextlib.contextmanager
+    def _connect(self):
+        # Several server processes may ingest at the same time
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def lookup(self, classifier, hashes):
+        """Cached labels for ``hashes``, indexed by hash; unknown hashes are left out."""
+        with self._connect() as connection:
+            connection.execute("CREATE TEMP TABLE wanted (text_hash INTEGER PRIMARY KEY)")
+            connection.executemany("INSERT OR IGNORE INTO wanted VALUES (?)", ((int(h),) for h in hashes))
+            rows = connection.execute(
+                "SELECT text_hash, sentiment, emotion, politikfeld FROM labels JOIN wanted USING (text_hash) "
+                "WHERE classifier = ?", (classifier,)
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['text_hash', *LABEL_COLUMNS]).set_index('text_hash')
+
+    def store(self, classifier, hashes, labels):
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO labels VALUES (?, ?, ?, ?, ?)",
+                ((classifier, int(h), *row) for h, row in zip(hashes, labels[LABEL_COLUMNS].itertuples(index=False)))
+            )
+
+
+def label_posts(posts, classifier=None, cache=None, batch_size=None):
+    """Normalised labels for ``posts`` (a frame with ``Text``), aligned to its index.
+
+    Only posts whose text the cache does not know are classified, in batches of
+    ``batch_size`` distinct texts.
+    """
+    classifier = classifier or get_classifier()
+    if not classifier.cacheable:
+        return normalize_labels(classifier.classify(posts))
+
+    cache = cache or LabelCache()
+    batch_size = batch_size or config.CLASSIFY_BATCH
+    hashes = pd.Series(text_hashes(posts['Text']), index=posts.index)
+    # One representative post per distinct text
+    distinct = hashes.drop_duplicates()
+    known = cache.lookup(classifier.name, distinct)
+    missing = distinct[~distinct.isin(known.index)]
+    found = [known]
+    for start in range(0, len(missing), batch_size):
+        batch = missing.iloc[start:start + batch_size]
+        labels = normalize_labels(classifier.classify(posts.loc[batch.index]))
+        cache.store(classifier.name, batch, labels)
+        found.append(labels.set_axis(batch.to_numpy(), axis=0))
+    print(f"Labels by {classifier.name}: {len(missing)} posts classified, {len(known)} from cache")
+    found = [frame for frame in found if not frame.empty]
+    labels = pd.concat(found) if found else known
+    return labels.reindex(hashes.to_numpy()).set_axis(posts.index, axis=0)[LABEL_COLUMNS]
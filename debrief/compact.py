@@ -0,0 +1,186 @@
+"""Downcasting of loaded exports to compact dtypes, with a footprint report."""
+import string
+
+import numpy as np
+import pandas as pd
+
+# Coded dimensions become categoricals when they repeat enough to pay for the lookup
+CATEGORY_COLUMNS = ['Profil', 'Profil-ID', 'Partei', 'Gruppe', 'sentiment', 'emotion', 'politikfeld']
+COUNT_COLUMNS = ['Anzahl Likes', 'Anzahl Kommentare', 'Reaktionen, Kommentare & Shares',
+                 'Organische Impressionen/Aufrufe der Posts']
+RATE_COLUMNS = ['Post-Interaktionsrate', 'Engagement']
+
+# META ads exports; every other float column is a rate or an amount
+AD_CATEGORY_COLUMNS = ['Day', 'Campaign name', 'Ad Set Name', 'Ad name', 'Result type']
+AD_COUNT_COLUMNS = ['Reach', 'Impressions', 'Results', 'ThruPlays', 'Video plays']
+
+_SHORTCODE_ALPHABET = string.ascii_uppercase + string.ascii_lowercase + string.digits + '-_'
+# Shortcodes up to 10 characters, or 11 starting at most with 'P', fit in 64 bits
+_INSTAGRAM_LINK = r'^(https://www\.instagram\.com/[a-z]+/)([A-Za-z0-9_-]{1,10}|[A-P][A-Za-z0-9_-]{10})/$'
+_FACEBOOK_LINK = r'^(https://www\.facebook\.com/[^/]+/posts/)(\d+)$'
+
+
+def _decode_shortcode(shortcode):
+    value = 0
+    for char in shortcode:
+        value = value * 64 + _SHORTCODE_ALPHABET.index(char)
+    return value
+
+
+def _encode_shortcode(value):
+    chars = []
+    while True:
+        value, digit = divmod(int(value), 64)
+        chars.append(_SHORTCODE_ALPHABET[digit])
+        if not value:
+            return ''.join(reversed(chars))
+
+
+def _post_number(beitrag_id):
+    # Facebook Beitrag-IDs read '<Profil-ID>_<post>'; the post part ends the link
+    return str(beitrag_id).rpartition('_')[2]
+
+
+def _expand_links(templates, codes, beitrag_ids):
+    links = []
+    for template, code, beitrag_id in zip(templates, codes, beitrag_ids):
+        if '{shortcode}' in template:
+            template = template.replace('{shortcode}', _encode_shortcode(code))
+        if '{post}' in template:
+            template = template.replace('{post}', _post_number(beitrag_id))
+        links.append(template)
+    return links
+
+
+def _compact_links(data):
+    links = data['Link'].astype(str)
+    templates = links.copy()
+    codes = np.zeros(len(data), dtype=np.uint64)
+
+    instagram = links.str.extract(_INSTAGRAM_LINK)
+    is_instagram = instagram[0].notna()
+    templates[is_instagram] = instagram.loc[is_instagram, 0] + '{shortcode}/'
+    codes[is_instagram.to_numpy()] = [_decode_shortcode(code) for code in instagram.loc[is_instagram, 1]]
+
+    facebook = links.str.extract(_FACEBOOK_LINK)
+    is_facebook = facebook[1] == data['Beitrag-ID'].map(_post_number)
+    templates[is_facebook] = facebook.loc[is_facebook, 0] + '{post}'
+
+    # Anything that does not round-trip keeps its full link as its own template
+    mismatch = np.asarray(_expand_links(templates, codes, data['Beitrag-ID'])) != links.to_numpy()
+    templates[mismatch] = links[mismatch]
+    codes[mismatch] = 0
+
+    position = data.columns.get_loc('Link')
+    data = data.drop(columns='Link')
+    data.insert(position, 'Link-Vorlage', templates.astype('category'))
+    data.insert(position + 1, 'Link-Code', codes)
+    return data
+
+
+def _downcast_index_columns(data):
+    # Leftover index columns from earlier exports ('Unnamed: 0', 'Unnamed: 0.1')
+    for column in data.columns:
+        if column.startswith('Unnamed') and pd.api.types.is_integer_dtype(data[column]):
+            data[column] = pd.to_numeric(data[column], downcast='unsigned')
+
+
+def _downcast_counts(data, columns):
+    for column in columns:
+        if column not in data.columns:
+            continue
+        values = pd.to_numeric(data[column], errors='coerce')
+        complete = values.notna().all() and (values >= 0).all() and (values % 1 == 0).all()
+        if complete and values.max() <= np.iinfo(np.uint32).max:
+            data[column] = values.astype(np.uint32)
+        else:
+            data[column] = values.astype(np.float32)
+
+
+def _downcast_rates(data, columns):
+    for column in columns:
+        if column in data.columns:
+            data[column] = pd.to_numeric(data[column], errors='coerce').astype(np.float32)
+
+
+def _categorize(data, columns):
+    for column in columns:
+        if column in data.columns and data[column].nunique() <= len(data) // 2:
+            data[column] = data[column].astype('category')
+
+
+def _identifiers(data):
+    return data['Beitrag-ID'].astype(str) + '-' + data['Profil-ID'].astype(str)
+
+
+def compact_posts(data):
+    """Return ``data`` with minimal dtypes.
+
+    Coded dimensions become categoricals, complete counts ``uint32`` (counts with gaps,
+    such as hidden likes, ``float32``), rates ``float32``. ``identifier`` is dropped
+    and ``Link`` is split into a categorical template plus a 64-bit code when both
+    can be rebuilt exactly; ``expand_posts`` restores them for display.
+    """
+    data = data.copy()
+    _downcast_index_columns(data)
+    _downcast_counts(data, COUNT_COLUMNS)
+    _downcast_rates(data, RATE_COLUMNS)
+
+    if 'Beitrag-ID' in data.columns:
+        beitrag_ids = pd.to_numeric(data['Beitrag-ID'], errors='coerce')
+        if beitrag_ids.notna().all() and (beitrag_ids >= 0).all():
+            data['Beitrag-ID'] = beitrag_ids.astype(np.uint64)
+
+    if {'identifier', 'Beitrag-ID', 'Profil-ID'} <= set(data.columns):
+        if (data['identifier'] == _identifiers(data)).all():
+            data = data.drop(columns='identifier')
+
+    if {'Link', 'Beitrag-ID'} <= set(data.columns):
+        data = _compact_links(data)
+
+    _categorize(data, CATEGORY_COLUMNS)
+    return data
+
+
+def compact_ads(data):
+    """Return the META ads export ``data`` with minimal dtypes, like ``compact_posts``."""
+    data = data.copy()
+    _downcast_index_columns(data)
+    _downcast_counts(data, AD_COUNT_COLUMNS)
+    _downcast_rates(data, [column for column in data.columns
+                           if data[column].dtype == np.float64 and column not in AD_COUNT_COLUMNS])
+    _categorize(data, AD_CATEGORY_COLUMNS)
+    return data
+
+
+def expand_posts(data):
+    """Rebuild ``Link`` and ``identifier`` dropped by ``compact_posts``, for display."""
+    data = data.copy()
+    if 'Link-Vorlage' in data.columns:
+        position = data.columns.get_loc('Link-Vorlage')
+        links = _expand_links(data['Link-Vorlage'].astype(str), data['Link-Code'], data['Beitrag-ID'])
+        data = data.drop(columns=['Link-Vorlage', 'Link-Code'])
+        data.insert(position, 'Link', pd.Series(links, index=data.index, dtype=object))
+    if 'identifier' not in data.columns and {'Beitrag-ID', 'Profil-ID'} <= set(data.columns):
+        data.insert(len(data.columns), 'identifier', _identifiers(data))
+    return data
+
+
+def footprint_report(name, before, after):
+    """Per-column ``memory_usage(deep=True)`` of ``before`` and ``after``, as text."""
+    usage_before = before.memory_usage(deep=True, index=False)
+    usage_after = after.memory_usage(deep=True, index=False)
+    table = pd.DataFrame({
+        'dtype before': before.dtypes.astype(str),
+        'KiB before': usage_before / 1024,
+        'dtype after': after.dtypes.astype(str),
+        'KiB after': usage_after / 1024,
+    })
+    table = table.reindex([*before.columns, *(column for column in after.columns if column not in before.columns)])
+    total_before, total_after = usage_before.sum(), usage_after.sum()
+    lines = [
+        f"Memory footprint of {name}: {total_before / 1024:.1f} KiB -> {total_after / 1024:.1f} KiB"
+        f" ({total_after / total_before:.0%})",
+        table.to_string(float_format='{:.1f}'.format, na_rep='-'),
+    ]
+    return '\n'.join(lines)
@@ -0,0 +1,57 @@
+"""Runtime settings, overridable through environment variables."""
+import os
+
+# Word clouds are rendered in a process pool, one task per category
+WORDCLOUD_WORKERS = int(os.environ.get('DEBRIEF_WORDCLOUD_WORKERS', os.cpu_count() or 1))
+WORDCLOUD_TIMEOUT = float(os.environ.get('DEBRIEF_WORDCLOUD_TIMEOUT', 60))
+
+# Derived files (text stores, snapshots) are written here
+CACHE_DIR = os.environ.get('DEBRIEF_CACHE_DIR', '.cache')
+
+# When set, parsed tables are published here as memory-mapped Arrow files and
+# shared read-only by every server process on the host
+SHARED_DIR = os.environ.get('DEBRIEF_SHARED_DIR') or None
+
+# Weekly exports land here; the newest one matching EXPORT_PATTERN is served
+DATA_DIR = os.environ.get('DEBRIEF_DATA_DIR', 'pages/data')
+EXPORT_PATTERN = os.environ.get('DEBRIEF_EXPORT_PATTERN', r'^[A-Z][a-z]{2}(\d{2})-(\d{2})\.(\d{2})\.csv$')
+WATCH_INTERVAL = float(os.environ.get('DEBRIEF_WATCH_INTERVAL', 30))
+
+# 'pandas' filters the in-memory frames; 'duckdb' runs the page queries as SQL
+# over Parquet copies of the snapshots (requires the optional duckdb package)
+QUERY_BACKEND = os.environ.get('DEBRIEF_QUERY_BACKEND', 'pandas')
+
+# Plotly line charts with more points than this are drawn with WebGL (Scattergl)
+WEBGL_THRESHOLD = int(os.environ.get('DEBRIEF_WEBGL_THRESHOLD', 1000))
+
+# The summaries rank categories by the lower bound of a bootstrap confidence
+# interval of their mean; categories with fewer posts than MIN_SUPPORT are not ranked
+BOOTSTRAP_RESAMPLES = int(os.environ.get('DEBRIEF_BOOTSTRAP_RESAMPLES', 2000))
+MIN_SUPPORT = int(os.environ.get('DEBRIEF_MIN_SUPPORT', 10))
+# Resamples times posts of one category; about 12 bytes each while it is resampled
+BOOTSTRAP_MAX_DRAWS = int(os.environ.get('DEBRIEF_BOOTSTRAP_MAX_DRAWS', 5_000_000))
+
+# Labels for sentiment, emotion and politikfeld: 'export' keeps the ones in the
+# export, 'lexicon' classifies the posts with LEXICON (a JSON file, or the built-in
+# one when unset), 'package.module:attribute' plugs in another classifier
+CLASSIFIER = os.environ.get('DEBRIEF_CLASSIFIER', 'export')
+LEXICON = os.environ.get('DEBRIEF_LEXICON') or None
+CLASSIFY_BATCH = int(os.environ.get('DEBRIEF_CLASSIFY_BATCH', 512))
+
+# Posts whose texts are at least this similar (estimated Jaccard similarity of
+# their character shingles) count as near-duplicates
+DUPLICATE_THRESHOLD = float(os.environ.get('DEBRIEF_DUPLICATE_THRESHOLD', 0.8))
+
+# New posts whose log likes, comments or interaction rate are ANOMALY_THRESHOLD
+# standard deviations from their profile's exponentially weighted mean (weight
+# ANOMALY_ALPHA per post) are flagged, once the profile has ANOMALY_MIN_HISTORY posts
+ANOMALY_ALPHA = float(os.environ.get('DEBRIEF_ANOMALY_ALPHA', 0.1))
+ANOMALY_THRESHOLD = float(os.environ.get('DEBRIEF_ANOMALY_THRESHOLD', 3.0))
+ANOMALY_MIN_HISTORY = int(os.environ.get('DEBRIEF_ANOMALY_MIN_HISTORY', 5))
+
+# While no page has run for PREFETCH_IDLE seconds, a background worker computes the
+# filter states most likely to be picked next, busy at most PREFETCH_CPU of the time
+# (0 turns it off); PREFETCH_STATES filter states are kept for all sessions
+PREFETCH_CPU = float(os.environ.get('DEBRIEF_PREFETCH_CPU', 0.25))
+PREFETCH_IDLE = float(os.environ.get('DEBRIEF_PREFETCH_IDLE', 5))
+PREFETCH_STATES = int(os.environ.get('DEBRIEF_PREFETCH_STATES', 64))
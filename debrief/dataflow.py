@@ -0,0 +1,80 @@
+"""Memoised dataflow nodes, so a rerun only recomputes what its inputs changed.
+
+A page declares each derived artefact (filtered frame, summaries, chart data,
+word clouds) as a node naming its inputs: sources set by the page on every run
+(dataset version, filter state, widget values) or other nodes. A node's key is
+built from the keys of its inputs, never from the frames they hold, and its last
+value is reused for as long as that key stays the same::
+
+    flow = session_flow('Instagram 2025')
+    flow.source('phrase', phrase)
+
+    @flow.node('posts')
+    def filtered_data(posts):
+        return posts.frame()
+
+    filtered_data = flow.get('filtered_data')
+
+Typing a phrase then recomputes the nodes downstream of ``phrase`` only, and
+switching the word cloud type leaves the filtering and charts alone. Node
+functions must not read anything but their declared inputs, and callers must
+not modify the values they get back.
+"""
+import streamlit as st
+
+_MISSING = object()
+
+
+def freeze(value):
+    # Widget values come as lists and filters as dicts; make them usable in keys
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(value, key=repr))
+    return value
+
+
+class Dataflow:
+    """Nodes of one page, each memoised on the keys of its inputs."""
+
+    def __init__(self):
+        self._nodes = {}
+        self._sources = {}
+        # name -> (key, value) of the last computation
+        self._memo = {}
+
+    def source(self, name, value, key=_MISSING):
+        """Set an input of this run; ``key`` identifies values that are not hashable themselves."""
+        self._sources[name] = (freeze(value) if key is _MISSING else key, value)
+
+    def node(self, *inputs):
+        """Declare the decorated function as a node computed from ``inputs``."""
+        def register(function):
+            self._nodes[function.__name__] = (function, inputs)
+            return function
+        return register
+
+    def key(self, name):
+        if name in self._sources:
+            return self._sources[name][0]
+        _, inputs = self._nodes[name]
+        return name, tuple(self.key(input) for input in inputs)
+
+    def get(self, name):
+        if name in self._sources:
+            return self._sources[name][1]
+        key = self.key(name)
+        memo = self._memo.get(name)
+        if memo is not None and memo[0] == key:
+            return memo[1]
+        function, inputs = self._nodes[name]
+        value = function(*(self.get(input) for input in inputs))
+        self._memo[name] = (key, value)
+        return value
+
+
+def session_flow(page):
+    """The dataflow of ``page`` for the current browser session."""
+    return st.session_state.setdefault(f"dataflow:{page}", Dataflow())
@@ -0,0 +1,197 @@
+"""Near-duplicate posts (cross-posts, republished texts) by MinHash and LSH banding.
+
+Each distinct ``Text`` gets a MinHash signature over its character shingles.
+Signatures are kept by text hash in ``CACHE_DIR/minhash.npz``, so a new weekly
+snapshot only signs the posts that are new or edited. The signatures are split
+into bands; posts sharing a band are candidates, and candidates whose signatures
+agree on at least ``DEBRIEF_DUPLICATE_THRESHOLD`` of their values (the estimated Jaccard similarity
+of their shingles) are put into the same cluster. Finding the candidates of a
+post is a lookup per band, not a comparison with every other post.
+
+Clusters are computed per snapshot in an ingest hook; a cluster's id is its
+smallest row id.
+"""
+import os
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from debrief import config
+from debrief.classify import text_hashes
+
+SHINGLE_SIZE = 5
+NUM_PERM = 128
+# 32 bands of 4 rows: two texts of similarity s share a band with probability 1 - (1 - s^4)^32,
+# 0.23 at 0.3, 0.87 at 0.5, 0.99 at 0.6 and 1 - 5e-8 at the 0.8 threshold. Candidates below
+# the threshold cost one signature comparison each; a missed pair would never be clustered
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+THRESHOLD = config.DUPLICATE_THRESHOLD
+
+_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20250218)
+_A = _rng.integers(1, _PRIME, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _PRIME, NUM_PERM, dtype=np.uint64)
+_SHINGLE_WEIGHTS = (256 ** np.arange(SHINGLE_SIZE)).astype(np.uint64)
+
+KEEP_CLUSTERINGS = 2
+_clusterings = {}
+_index = None
+_lock = threading.Lock()
+
+
+def shingles(text):
+    """Distinct hashes of the character shingles of ``text``, case and spacing ignored."""
+    data = np.frombuffer(' '.join(text.lower().split()).encode('utf-8'), dtype=np.uint8)
+    if len(data) < SHINGLE_SIZE:
+        return np.empty(0, dtype=np.uint64)
+    windows = sliding_window_view(data, SHINGLE_SIZE).astype(np.uint64)
+    return np.unique((windows @ _SHINGLE_WEIGHTS) % np.uint64(_PRIME))
+
+
+def signature(text):
+    """MinHash signature of ``text``, or None if it is too short to have shingles."""
+    values = shingles(text)
+    if not len(values):
+        return None
+    return ((_A[:, None] * values[None, :] + _B[:, None]) % np.uint64(_PRIME)).min(axis=1).astype(np.uint32)
+
+
+class MinHashIndex:
+    """Signatures by text hash, with one LSH bucket table per band."""
+
+    def __init__(self, hashes=None, signatures=None):
+        self.hashes = np.empty(0, dtype=np.int64) if hashes is None else hashes
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint32) if signatures is None else signatures
+        self._positions = {}
+        self._buckets = [defaultdict(list) for _ in range(BANDS)]
+        self._insert(0)
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as stored:
+                return cls(stored['hashes'], stored['signatures'])
+        except (OSError, KeyError, ValueError):
+            return cls()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Other server processes may read it at the same time; replace it whole
+        with open(f"{path}.tmp", 'wb') as f:
+            np.savez(f, hashes=self.hashes, signatures=self.signatures)
+        os.replace(f"{path}.tmp", path)
+
+    def _insert(self, start):
+        for position in range(start, len(self.hashes)):
+            text_hash = int(self.hashes[position])
+            self._positions[text_hash] = position
+            bands = self.signatures[position].reshape(BANDS, ROWS)
+            # Texts without shingles are stored as all-zero signatures and never bucketed
+            if bands.any():
+                for band, values in enumerate(bands):
+                    self._buckets[band][values.tobytes()].append(text_hash)
+
+    def __contains__(self, text_hash):
+        return int(text_hash) in self._positions
+
+    def add(self, hashes, texts):
+        """Sign the texts whose hashes are not in the index yet; returns how many."""
+        # The list keeps the order of the new texts, the set makes the lookup O(1)
+        new_hashes, new_signatures, seen = [], [], set()
+        for text_hash, text in zip(hashes, texts):
+            text_hash = int(text_hash)
+            if text_hash in self._positions or text_hash in seen:
+                continue
+            seen.add(text_hash)
+            new_hashes.append(text_hash)
+            value = signature(text)
+            new_signatures.append(np.zeros(NUM_PERM, dtype=np.uint32) if value is None else value)
+        if new_hashes:
+            start = len(self.hashes)
+            self.hashes = np.concatenate([self.hashes, np.asarray(new_hashes, dtype=np.int64)])
+            self.signatures = np.vstack([self.signatures, np.asarray(new_signatures)])
+            self._insert(start)
+        return len(new_hashes)
+
+    def candidates(self, text_hash):
+        """Text hashes sharing at least one band with ``text_hash``."""
+        bands = self.signatures[self._positions[int(text_hash)]].reshape(BANDS, ROWS)
+        if not bands.any():
+            return set()
+        found = set()
+        for band, values in enumerate(bands):
+            found.update(self._buckets[band].get(values.tobytes(), ()))
+        found.discard(int(text_hash))
+        return found
+
+    def similarity(self, first, second):
+        """Estimated Jaccard similarity of the shingles of two indexed texts."""
+        return float(np.mean(self.signatures[self._positions[int(first)]]
+                             == self.signatures[self._positions[int(second)]]))
+
+    def similar(self, text_hash, threshold=THRESHOLD):
+        return {other for other in self.candidates(text_hash) if self.similarity(text_hash, other) >= threshold}
+
+
+def _index_path():
+    return os.path.join(config.CACHE_DIR, 'minhash.npz')
+
+
+def cluster(index, hashes, threshold=THRESHOLD):
+    """Cluster id (smallest member position) for each position of ``hashes``."""
+    hashes = np.asarray(hashes, dtype=np.int64)
+    first = {}
+    for position, text_hash in enumerate(hashes.tolist()):
+        first.setdefault(text_hash, position)
+    # Union-find over the distinct texts of this snapshot
+    parent = {text_hash: text_hash for text_hash in first}
+
+    def root(text_hash):
+        while parent[text_hash] != text_hash:
+            parent[text_hash] = parent[parent[text_hash]]
+            text_hash = parent[text_hash]
+        return text_hash
+
+    for text_hash in first:
+        for other in index.similar(text_hash, threshold):
+            if other in parent:
+                parent[root(other)] = root(text_hash)
+    smallest = {}
+    for text_hash, position in first.items():
+        top = root(text_hash)
+        smallest[top] = min(smallest.get(top, position), position)
+    return np.fromiter((smallest[root(text_hash)] for text_hash in hashes.tolist()), dtype=np.int64,
+                       count=len(hashes))
+
+
+def index_snapshot(snapshot):
+    """Ingest hook: sign the new texts of ``snapshot`` and cluster its posts."""
+    global _index
+    texts = pd.Series(snapshot.post_texts.get_many(range(len(snapshot.post_texts))), dtype=object)
+    hashes = text_hashes(texts)
+    with _lock:
+        if _index is None:
+            _index = MinHashIndex.load(_index_path())
+        if _index.add(hashes, texts):
+            _index.save(_index_path())
+        clusters = cluster(_index, hashes)
+    # Empty posts are not duplicates of each other
+    empty = (texts.str.strip() == '').to_numpy()
+    clusters[empty] = np.flatnonzero(empty)
+    clusters = pd.Series(clusters, name='cluster')
+    with _lock:
+        _clusterings[snapshot.version] = clusters
+        for version in list(_clusterings)[:-KEEP_CLUSTERINGS]:
+            del _clusterings[version]
+    return clusters
+
+
+def cluster_ids(snapshot):
+    """Cluster id per row id of ``snapshot``; posts without near-duplicates are their own cluster."""
+    with _lock:
+        clusters = _clusterings.get(snapshot.version)
+    return clusters if clusters is not None else index_snapshot(snapshot)
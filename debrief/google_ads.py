@@ -0,0 +1,104 @@
+"""Google and YouTube Ads exports as a store partitioned by campaign type and year.
+
+``processing.ipynb`` concatenates the Google exports (read with ``skiprows=[0, 1]``)
+into ``search_all.csv``, ``video_all.csv`` and ``display_all.csv``. Dropped into
+``pages/data`` they are converted into two Hive-partitioned Parquet datasets under
+the cache directory::
+
+    google_ads/rows/campaign_type=search/year=2024/...
+    google_ads/daily/campaign_type=search/year=2024/...
+
+``daily`` holds spend, clicks and impressions pre-aggregated per day and campaign,
+which is all the KPIs need. Filters on campaign type and year become partition
+filters, so unselected partitions are never opened.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from debrief import config, partitioned
+
+CAMPAIGN_TYPES = ['search', 'video', 'display']
+PARTITION_SCHEMA = [('campaign_type', pa.string()), ('year', pa.int32())]
+DAILY_METRICS = ['Cost', 'Clicks', 'Impr.']
+# Text columns of the exports; everything else is parsed as a number
+TEXT_COLUMNS = ['Day', 'Campaign', 'Ad group', 'Ad', 'Currency code', 'Campaign type', 'Campaign status']
+
+
+def store_dir():
+    return os.path.join(config.CACHE_DIR, 'google_ads')
+
+
+def source_paths(data_dir=None):
+    data_dir = data_dir or config.DATA_DIR
+    paths = {kind: os.path.join(data_dir, f"{kind}_all.csv") for kind in CAMPAIGN_TYPES}
+    return {kind: path for kind, path in paths.items() if os.path.exists(path)}
+
+
+def source_version(data_dir=None):
+    """Changes whenever one of the exports is added or replaced."""
+    return tuple(sorted((kind, os.path.getmtime(path)) for kind, path in source_paths(data_dir).items()))
+
+
+def _to_number(values):
+    # '10,033' and '16.36%' as exported by Google Ads
+    cleaned = values.astype(str).str.replace(',', '', regex=False).str.rstrip('%').str.strip()
+    return pd.to_numeric(cleaned.replace({'--': None, '': None, 'nan': None}), errors='coerce')
+
+
+def read_export(path, kind):
+    data = pd.read_csv(path, index_col=0)
+    data.columns = data.columns.str.strip()
+    data['Day'] = pd.to_datetime(data['Day'], errors='coerce')
+    # Drop the 'Total: ...' summary rows Google appends to each export
+    data = data.dropna(subset=['Day'])
+    for column in data.columns:
+        if column not in TEXT_COLUMNS and data[column].dtype == object:
+            data[column] = _to_number(data[column])
+    data['campaign_type'] = kind
+    data['year'] = data['Day'].dt.year.astype('int32')
+    return data
+
+
+def _daily(data):
+    metrics = data.reindex(columns=['campaign_type', 'year', 'Day', 'Campaign', *DAILY_METRICS])
+    return metrics.groupby(['campaign_type', 'year', 'Day', 'Campaign'], as_index=False, dropna=False).sum(min_count=1)
+
+
+def ensure_store(data_dir=None):
+    """Build the store unless it is up to date with the exports; returns its version."""
+    version = repr(source_version(data_dir))
+    if partitioned.read_version(store_dir()) != version:
+        build_store(data_dir)
+        partitioned.write_version(store_dir(), version)
+    return version
+
+
+def build_store(data_dir=None):
+    """(Re)build the partitioned store from the exports in ``data_dir``."""
+    building = partitioned.building_dir(store_dir())
+    for kind, path in source_paths(data_dir).items():
+        data = read_export(path, kind)
+        # Each campaign type has its own columns, so rows/ is only ever read one type at a time
+        partitioned.write(data, os.path.join(building, 'rows'), ['campaign_type', 'year'])
+        partitioned.write(_daily(data), os.path.join(building, 'daily'), ['campaign_type', 'year'])
+    partitioned.swap_in(building, store_dir())
+
+
+def partitions():
+    """``(campaign_type, year)`` pairs present in the store, from the directory names only."""
+    return [(campaign_type, int(year))
+            for campaign_type, year in partitioned.partitions(os.path.join(store_dir(), 'daily'))]
+
+
+def read_daily(campaign_types, years):
+    return partitioned.read(os.path.join(store_dir(), 'daily'), PARTITION_SCHEMA,
+                            {'campaign_type': campaign_types, 'year': years},
+                            ['Day', 'Campaign', *DAILY_METRICS, 'campaign_type', 'year'])
+
+
+def read_rows(campaign_type, years, columns=None):
+    """Raw export rows of one campaign type; each type has its own columns."""
+    return partitioned.read(os.path.join(store_dir(), 'rows', f"campaign_type={campaign_type}"),
+                            PARTITION_SCHEMA[1:], {'year': years}, columns)
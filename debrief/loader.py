@@ -0,0 +1,124 @@
+"""Loading and preprocessing of the Instagram and META ads exports.
+
+With ``DEBRIEF_SHARED_DIR`` set, the parsed tables are published once per host
+through ``debrief.shared`` and every server process attaches them read-only. The
+text stores of the posts are kept next to them, so a process that attaches a
+table another one published finds its texts too.
+"""
+import contextlib
+import os
+
+import pandas as pd
+
+from debrief import config, shared
+from debrief.classify import LABEL_COLUMNS, label_posts
+from debrief.compact import compact_ads, compact_posts, footprint_report
+from debrief.text_store import TextStore
+
+
+def dataset_name(path):
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+def text_store_path(path):
+    return os.path.join(config.SHARED_DIR or config.CACHE_DIR, f"{dataset_name(path)}-text")
+
+
+def data_version(path):
+    """Changes whenever ``load_posts``/``load_ads`` would return new data for ``path``.
+
+    Pages pass it into their cached loaders so a republished table is picked up.
+    """
+    if config.SHARED_DIR:
+        return shared.current_version(dataset_name(path))
+    return os.path.getmtime(path)
+
+
+def _load(path, read):
+    if config.SHARED_DIR:
+        return shared.load_shared(dataset_name(path), path, lambda: read(path))
+    return read(path)
+
+
+def load_posts(path):
+    """Load an Instagram export such as ``Jan25-18.02.csv``.
+
+    Returns the working frame, which has no ``Text`` column and is downcast by
+    ``compact_posts``, and the ``TextStore`` holding the post bodies by row id (the
+    frame's index). A before/after memory report is printed for each parse.
+    """
+    data = _load(path, _read_posts)
+    return data, _text_store(path, len(data))
+
+
+def _fresh_text_store(store_path, path, rows):
+    if TextStore.is_fresh(store_path, path):
+        post_texts = TextStore(store_path)
+        if len(post_texts) == rows:
+            return post_texts
+    return None
+
+
+def _text_store(path, rows):
+    store_path = text_store_path(path)
+    post_texts = _fresh_text_store(store_path, path, rows)
+    if post_texts is not None:
+        return post_texts
+    # The table was published without a store here, e.g. by a version that kept it in CACHE_DIR
+    with shared.locked(dataset_name(path)) if config.SHARED_DIR else contextlib.nullcontext():
+        post_texts = _fresh_text_store(store_path, path, rows)
+        if post_texts is None:
+            texts = pd.read_csv(path, usecols=lambda column: column.strip() == 'Text').iloc[:, 0]
+            post_texts = TextStore.build(texts, store_path)
+    return post_texts
+
+
+def load_ads(path):
+    """Load the META ads export ``all_meta_ads.csv``, downcast by ``compact_ads``."""
+    return _load(path, _read_ads)
+
+
+def _read_posts(path):
+    data = pd.read_csv(path)
+
+    # Ensure column names are consistent
+    data.columns = data.columns.str.strip()
+
+    # Sentiment, emotion and politikfeld from the configured classifier, normalised
+    data[LABEL_COLUMNS] = label_posts(data)
+
+    # Preprocess data: convert strings with commas to numeric
+    data['Anzahl Likes'] = data['Anzahl Likes'].str.replace(',', '').astype(float)
+    data['Anzahl Kommentare'] = data['Anzahl Kommentare'].str.replace(',', '').astype(float)
+    data['Reaktionen, Kommentare & Shares'] = data['Reaktionen, Kommentare & Shares'].str.replace(',', '').astype(float)
+    data['Post-Interaktionsrate'] = data['Post-Interaktionsrate'].str.replace(',', '.').astype(float)
+
+    # Convert 'Datum' to datetime
+    data['Datum'] = data['Datum'].str.replace(',', ' ')
+    data['Datum'] = pd.to_datetime(data['Datum'], format='%d.%m.%y %H:%M', errors='coerce')
+
+    # Move the post bodies into the text store; the frame keeps metrics and coded dimensions
+    store_path = text_store_path(path)
+    texts = data.pop('Text')
+    post_texts = TextStore(store_path) if TextStore.is_fresh(store_path, path) else None
+    if post_texts is None or len(post_texts) != len(texts):
+        TextStore.build(texts, store_path)
+
+    compact = compact_posts(data)
+    print(footprint_report(os.path.basename(path), data, compact))
+    return compact
+
+
+def _read_ads(path):
+    data = pd.read_csv(path)
+
+    # Preprocess the new data
+    data.columns = data.columns.str.strip()
+
+    # Convert reporting dates to datetime
+    data['Reporting starts'] = pd.to_datetime(data['Reporting starts'])
+    data['Reporting ends'] = pd.to_datetime(data['Reporting ends'])
+
+    compact = compact_ads(data)
+    print(footprint_report(os.path.basename(path), data, compact))
+    return compact
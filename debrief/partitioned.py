@@ -0,0 +1,78 @@
+"""Helpers for the Hive-partitioned Parquet stores (``key=value`` directories)."""
+import os
+import shutil
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+
+def write(frame, root, partition_cols):
+    pq.write_to_dataset(pa.Table.from_pandas(frame, preserve_index=False), root, partition_cols=partition_cols)
+
+
+def building_dir(target):
+    """An empty directory next to ``target`` to build its replacement in."""
+    building = f"{target}.building"
+    shutil.rmtree(building, ignore_errors=True)
+    return building
+
+
+def swap_in(building, target):
+    """Replace the store at ``target`` with the finished one at ``building``."""
+    os.makedirs(building, exist_ok=True)
+    # Readers of the old store keep their open files until they are done
+    if os.path.exists(target):
+        shutil.rmtree(f"{target}.old", ignore_errors=True)
+        os.replace(target, f"{target}.old")
+    os.replace(building, target)
+    shutil.rmtree(f"{target}.old", ignore_errors=True)
+
+
+def read_version(root):
+    try:
+        with open(os.path.join(root, 'VERSION')) as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def write_version(root, version):
+    with open(os.path.join(root, 'VERSION'), 'w') as f:
+        f.write(version)
+
+
+def partitions(root, depth=2):
+    """Partition values found under ``root``, from the directory names only."""
+    if not os.path.isdir(root):
+        return []
+    found = [()]
+    for _ in range(depth):
+        deeper = []
+        for values in found:
+            directory = os.path.join(root, *values)
+            for name in sorted(os.listdir(directory)):
+                if '=' in name and os.path.isdir(os.path.join(directory, name)):
+                    deeper.append((*values, name))
+        found = deeper
+    return [tuple(name.split('=', 1)[1] for name in values) for values in found]
+
+
+def read(root, schema, filters, columns=None):
+    """Read ``root``, pruning partitions by ``filters`` (partition key -> allowed values).
+
+    ``schema`` lists the partition keys and their Arrow types, e.g.
+    ``[('campaign_type', pa.string()), ('year', pa.int32())]``.
+    """
+    if not os.path.isdir(root):
+        return pd.DataFrame(columns=columns)
+    dataset = ds.dataset(root, format='parquet', partitioning=ds.partitioning(pa.schema(schema), flavor='hive'))
+    # Conditions on partition keys are resolved against the directory names before any file is opened
+    condition = None
+    types = dict(schema)
+    for key, values in filters.items():
+        # Typed, so that an empty selection matches nothing instead of failing
+        clause = ds.field(key).isin(pa.array(list(values), type=types.get(key)))
+        condition = clause if condition is None else condition & clause
+    return dataset.to_table(columns=columns, filter=condition).to_pandas()
@@ -0,0 +1,327 @@
+"""Results of the Instagram pages shared by all sessions, and warmed ahead while idle.
+
+The filtered posts, the bootstrap ranking of their categories and the word clouds
+of a filter state are kept for every session on the server, by export version
+and filter state. The pages record the filter states they run with. Most
+sessions follow the same path (all posts, a Gruppe, a Profil within it, a
+sentiment), so a background worker ranks the states likely to be picked next:
+
+- the states and single selections made most often,
+- every single Gruppe and Profil, weighted by its share of the posts,
+- one more filter below each recently used state, e.g. the Profile of the
+  selected Gruppe.
+
+Once no page has run for ``DEBRIEF_PREFETCH_IDLE`` seconds, it computes the
+best-ranked states that are not cached yet, with the page defaults (no phrase,
+duplicates not collapsed, word clouds by sentiment). It works at most
+``DEBRIEF_PREFETCH_CPU`` of the time and fills at most half of each cache, so
+the states the sessions pick themselves do not push its ones out right away,
+and a pass with nothing new to warm does nothing. A common drill-down is then
+served from memory on its first click.
+
+Word clouds are rendered in a pool of their own, so a stuck render of the
+worker never cancels those of a page, or the other way round.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict, deque
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from debrief import config, stats
+from debrief.dataflow import freeze
+from debrief.query import post_query
+from debrief.watcher import current_snapshot
+from debrief.wordclouds import iter_wordclouds
+
+# The pages filter by Gruppe and Profil, not by Partei
+SINGLE_COLUMNS = ['Gruppe', 'Profil']
+# The sidebar drill-down: below a Gruppe come its Profile, below a Profil its sentiments
+DRILL_DOWN = {'Gruppe': 'Profil', 'Profil': 'sentiment'}
+DIMENSIONS = ['sentiment', 'emotion', 'politikfeld']
+DEFAULT_WORDCLOUD = 'sentiment'
+# A word cloud is about 1 MB; fewer states keep theirs
+MAX_CLOUD_STATES = 16
+RECENT_STATES = 8
+# Drill-downs are warmed for the values with the most posts
+DRILL_DOWN_VALUES = 10
+# A session's state is remembered to count it once per change; this many sessions
+MAX_SESSIONS = 1024
+
+
+class SharedResults:
+    """Results by key for all sessions, least recently used dropped first."""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._results
+
+    def get(self, key, build):
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+        result = build()
+        with self._lock:
+            # Another session may have built it meanwhile; keep the first
+            result = self._results.setdefault(key, result)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+        return result
+
+    def update(self, key, update):
+        """Replace the result of ``key`` by ``update(result)``, None if there is none."""
+        with self._lock:
+            self._results[key] = update(self._results.get(key))
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_entries:
+                self._results.popitem(last=False)
+
+
+_frames = SharedResults(config.PREFETCH_STATES)
+_performance = SharedResults(config.PREFETCH_STATES)
+_clouds = SharedResults(MAX_CLOUD_STATES)
+
+
+def state_key(snapshot, filters, phrase='', collapse=False):
+    return snapshot.version, freeze(filters), phrase, collapse
+
+
+def filtered_data(snapshot, filters, phrase='', collapse=False):
+    """The posts matching the state; callers must not modify the frame."""
+    def build():
+        frame = post_query(snapshot, filters, phrase, collapse).frame()
+        # Ensure that 'Post-Interaktionsrate' is numeric
+        if 'Post-Interaktionsrate' in frame.columns:
+            frame['Post-Interaktionsrate'] = pd.to_numeric(frame['Post-Interaktionsrate'], errors='coerce')
+        return frame
+    return _frames.get(state_key(snapshot, filters, phrase, collapse), build)
+
+
+def performance(snapshot, filters, phrase='', collapse=False):
+    """Per dimension the categories with enough posts, ranked by the lower bound of their interval."""
+    return _performance.get(state_key(snapshot, filters, phrase, collapse), lambda: {
+        dimension: stats.rank(stats.category_intervals(filtered_data(snapshot, filters, phrase, collapse), dimension))
+        for dimension in DIMENSIONS
+    })
+
+
+def cloud_texts(snapshot, dated_data, option):
+    """Joined post texts per category of ``option``."""
+    return {
+        label: snapshot.post_texts.join(rows)
+        for label, rows in dated_data.groupby(option, sort=False, observed=True).groups.items()
+    }
+
+
+def cloud_images(snapshot, filters, phrase, collapse, option):
+    """The word-cloud images of the state rendered so far, by label.
+
+    The dict is shared by all sessions and the worker and never changed; a
+    finished image is published with ``add_cloud`` as a new dict.
+    """
+    return _clouds.get((*state_key(snapshot, filters, phrase, collapse), option), dict)
+
+
+def add_cloud(snapshot, filters, phrase, collapse, option, label, image):
+    """Publish the word cloud of ``label``; a failed render (None) is not kept, so it is tried again."""
+    if image is None:
+        return
+    _clouds.update((*state_key(snapshot, filters, phrase, collapse), option),
+                   lambda images: {**(images or {}), label: image})
+
+
+class Usage:
+    """How often each filter state and each single selection was picked, and the recent states."""
+
+    def __init__(self):
+        self.states = Counter()
+        self.selections = Counter()
+        self.recent = deque(maxlen=RECENT_STATES)
+        self.last_activity = 0.0
+        # Counts the changes, so that unchanged usage is not saved again
+        self.changes = 0
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def observe(self, session, filters):
+        state = freeze(filters)
+        with self._lock:
+            self.last_activity = time.monotonic()
+            if self._sessions.get(session) == state:
+                return
+            self._sessions[session] = state
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+            self.changes += 1
+            self.states[state] += 1
+            for column, values in state:
+                for value in values:
+                    self.selections[(column, value)] += 1
+            if state in self.recent:
+                self.recent.remove(state)
+            self.recent.append(state)
+
+    def idle_seconds(self):
+        return time.monotonic() - self.last_activity
+
+    @classmethod
+    def load(cls, path):
+        usage = cls()
+        try:
+            with open(path, encoding='utf-8') as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return usage
+        for filters, count in stored.get('states', []):
+            usage.states[freeze(dict(filters))] = count
+        for column, value, count in stored.get('selections', []):
+            usage.selections[(column, value)] = count
+        return usage
+
+    def save(self, path):
+        with self._lock:
+            stored = {
+                'states': [[[[column, list(values)] for column, values in state], count]
+                           for state, count in self.states.most_common(1000)],
+                'selections': [[column, value, count] for (column, value), count in self.selections.items()],
+            }
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(stored, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+
+
+def candidates(snapshot, usage):
+    """Filter states to warm, most likely next first."""
+    data = snapshot.data
+    scores = Counter({(): 1.0})
+    with usage._lock:
+        states, selections, recent = Counter(usage.states), Counter(usage.selections), list(usage.recent)
+    for column in SINGLE_COLUMNS:
+        shares = data[column].value_counts(normalize=True)
+        for value, share in shares[shares > 0].items():
+            scores[freeze({column: [value]})] += selections[(column, value)] + share
+    for state, count in states.items():
+        scores[state] += 2 * count
+    for state in recent:
+        filters = {column: list(values) for column, values in state}
+        below = [DRILL_DOWN[column] for column in filters if column in DRILL_DOWN and DRILL_DOWN[column] not in filters]
+        if not below:
+            continue
+        frame = filtered_data(snapshot, filters)
+        for column in dict.fromkeys(below):
+            for value in frame[column].value_counts().head(DRILL_DOWN_VALUES).loc[lambda counts: counts > 0].index:
+                scores[freeze({**filters, column: [value]})] += 1 + selections[(column, value)]
+    return [{column: list(values) for column, values in state} for state, _ in scores.most_common()]
+
+
+def is_warm(snapshot, filters, clouds=True):
+    """Whether ``warm`` has nothing left to compute; clouds that failed to render do not count."""
+    key = state_key(snapshot, filters)
+    return (key in _frames
+            and ('Post-Interaktionsrate' not in snapshot.data.columns or key in _performance)
+            and (not clouds or (*key, DEFAULT_WORDCLOUD) in _clouds))
+
+
+def warm(snapshot, filters, clouds=True):
+    """Compute what the pages show first for ``filters`` with their default widgets."""
+    frame = filtered_data(snapshot, filters)
+    if 'Post-Interaktionsrate' in frame.columns:
+        performance(snapshot, filters)
+    if not clouds:
+        return
+    images = cloud_images(snapshot, filters, '', False, DEFAULT_WORDCLOUD)
+    texts = cloud_texts(snapshot, frame.dropna(subset=['Datum']), DEFAULT_WORDCLOUD)
+    missing = {label: text for label, text in texts.items() if label not in images}
+    for label, image in iter_wordclouds(missing, max_workers=1, pool='prefetch'):
+        add_cloud(snapshot, filters, '', False, DEFAULT_WORDCLOUD, label, image)
+
+
+def _usage_path():
+    return os.path.join(config.CACHE_DIR, 'prefetch-usage.json')
+
+
+class Prefetcher:
+    def __init__(self, current, usage, interval=1.0):
+        # current() returns the snapshot being served
+        self.current = current
+        self.usage = usage
+        self.interval = interval
+        self.warmed = 0
+        self._saved = usage.changes
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='prefetch', daemon=True)
+        self._thread.start()
+        return self
+
+    def idle(self):
+        return self.usage.idle_seconds() >= config.PREFETCH_IDLE
+
+    def run_once(self):
+        """Warm the best-ranked cold states while the server stays idle; returns how many."""
+        snapshot = self.current()
+        if snapshot is None or not self.idle():
+            return 0
+        warmed = 0
+        # Half of each cache, the rest is left to the states the sessions pick
+        states, cloud_states = config.PREFETCH_STATES // 2, MAX_CLOUD_STATES // 2
+        for rank, filters in enumerate(candidates(snapshot, self.usage)[:states]):
+            if not self.idle():
+                break
+            if is_warm(snapshot, filters, rank < cloud_states):
+                continue
+            started = time.monotonic()
+            warm(snapshot, filters, rank < cloud_states)
+            warmed += 1
+            # Rest so that the worker is busy at most PREFETCH_CPU of the time
+            busy = time.monotonic() - started
+            time.sleep(busy * (1 - config.PREFETCH_CPU) / config.PREFETCH_CPU)
+        self.warmed += warmed
+        changes = self.usage.changes
+        if changes != self._saved:
+            self.usage.save(_usage_path())
+            self._saved = changes
+        return warmed
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.run_once()
+            except Exception:
+                # Prefetching is best effort; the pages compute whatever is missing
+                traceback.print_exc()
+
+
+_prefetcher = None
+_prefetcher_lock = threading.Lock()
+
+
+def get_prefetcher():
+    """The process-wide prefetcher, started on first use unless DEBRIEF_PREFETCH_CPU is 0."""
+    global _prefetcher
+    with _prefetcher_lock:
+        if _prefetcher is None:
+            _prefetcher = Prefetcher(current_snapshot, Usage.load(_usage_path()))
+            if config.PREFETCH_CPU > 0:
+                _prefetcher.start()
+    return _prefetcher
+
+
+def observe(filters):
+    """Record that the current session runs a page with ``filters``."""
+    ctx = get_script_run_ctx()
+    get_prefetcher().usage.observe(ctx.session_id if ctx else None, filters)
@@ -0,0 +1,231 @@
+"""Filtering and aggregation behind the pages, in pandas or as SQL on DuckDB.
+
+Pages describe their sidebar state as ``filters``, a dict mapping a column to the
+selected values (columns left at 'All' are omitted), and ask a query object for
+the filtered frame or top rows. The pandas backend works on
+the snapshot frames in memory. The DuckDB backend translates the same state into
+SQL predicates over Parquet copies of the snapshots, so only the selected rows and
+the needed columns are read, and row groups outside the predicates are skipped.
+"""
+import importlib.util
+import os
+import re
+import tempfile
+import warnings
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from debrief import config, duplicates
+from debrief.loader import data_version, dataset_name
+
+ROW_GROUP_SIZE = 16_384
+DEFAULT_METRIC = 'Post-Interaktionsrate'
+
+_connection = None
+
+
+def use_duckdb():
+    if config.QUERY_BACKEND != 'duckdb':
+        return False
+    # The DuckDB backend is optional, and only imported once it is selected
+    if importlib.util.find_spec('duckdb') is None:
+        warnings.warn("DEBRIEF_QUERY_BACKEND=duckdb but duckdb is not installed; using pandas")
+        return False
+    return True
+
+
+def _cursor():
+    global _connection
+    if _connection is None:
+        import duckdb
+        _connection = duckdb.connect()
+    # One cursor per query, since Streamlit runs sessions in separate threads
+    return _connection.cursor()
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+def _columnar_file(name, version, build, sort_by):
+    version = re.sub(r'[^\w.-]', '_', str(version))
+    path = os.path.join(config.CACHE_DIR, f"{name}-{version}.parquet")
+    if not os.path.exists(path):
+        os.makedirs(config.CACHE_DIR, exist_ok=True)
+        # Sorted so the row-group statistics line up with the usual predicates
+        frame = build().sort_values(sort_by, kind='stable')
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        # Sessions may write the same file at once; each writes its own and the last rename wins
+        fd, tmp = tempfile.mkstemp(prefix=f"{name}-", suffix='.parquet.tmp', dir=config.CACHE_DIR)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pq.write_table(table, f, row_group_size=ROW_GROUP_SIZE)
+            os.replace(tmp, path)
+        except BaseException:
+            os.remove(tmp)
+            raise
+    return path
+
+
+def _table(path):
+    return "read_parquet('" + path.replace("'", "''") + "')"
+
+
+def _where(filters, phrase=None, text_column='Text'):
+    clauses, params = [], []
+    for column, values in filters.items():
+        values = list(values)
+        clauses.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})" if values else 'FALSE')
+        params.extend(values)
+    if phrase:
+        clauses.append(f"regexp_matches({_quote(text_column)}, ?, 'i')")
+        params.append(phrase)
+    return ' AND '.join(clauses) or 'TRUE', params
+
+
+def _mask(frame, filters):
+    mask = pd.Series(True, index=frame.index)
+    for column, values in filters.items():
+        mask &= frame[column].isin(values)
+    return mask
+
+
+def _earliest_per_cluster(frame, clusters):
+    # The earliest post of each near-duplicate cluster stands for the others
+    earliest = clusters.reindex(frame['Datum'].sort_values(kind='stable').index).drop_duplicates().index
+    return frame[frame.index.isin(earliest)]
+
+
+class PandasPostQuery:
+    def __init__(self, snapshot, filters, phrase='', collapse=False):
+        self.snapshot = snapshot
+        self.filters = filters
+        self.phrase = phrase
+        self.collapse = collapse
+        self._frame = None
+
+    def frame(self):
+        if self._frame is None:
+            data = self.snapshot.data
+            filtered = data[_mask(data, self.filters)]
+            if self.phrase:
+                filtered = filtered[self.snapshot.post_texts.contains(filtered.index, self.phrase)]
+            if self.collapse:
+                filtered = _earliest_per_cluster(filtered, duplicates.cluster_ids(self.snapshot))
+            # Like the SQL backend, only keep the categories present in the result
+            for column in filtered.columns:
+                if isinstance(filtered[column].dtype, pd.CategoricalDtype):
+                    filtered[column] = filtered[column].cat.remove_unused_categories()
+            self._frame = filtered
+        return self._frame
+
+    def top(self, dimension, value, n=3, metric=DEFAULT_METRIC):
+        frame = self.frame()
+        return frame[frame[dimension] == value].sort_values(by=metric, ascending=False).head(n)
+
+
+class DuckDBPostQuery:
+    def __init__(self, snapshot, filters, phrase='', collapse=False):
+        source = _columnar_file(f"{dataset_name(snapshot.path)}-posts", snapshot.version,
+                                lambda: self._columnar_frame(snapshot), ['Gruppe', 'Profil'])
+        self.table = _table(source)
+        self.where, self.params = _where(filters, phrase)
+        if collapse:
+            # Filter first, then keep the first post of each near-duplicate cluster
+            self.table = (f"(SELECT * FROM {self.table} WHERE {self.where} "
+                          f"QUALIFY row_number() OVER (PARTITION BY cluster ORDER BY \"Datum\", row_id) = 1)")
+            self.where = 'TRUE'
+        self._frame = None
+
+    @staticmethod
+    def _columnar_frame(snapshot):
+        data = snapshot.data
+        return data.assign(Text=snapshot.post_texts.get_many(data.index), row_id=data.index,
+                           cluster=duplicates.cluster_ids(snapshot).reindex(data.index).to_numpy())
+
+    def _query(self, sql, params=()):
+        return _cursor().execute(sql, [*self.params, *params]).df()
+
+    def _rows(self, sql, params=()):
+        rows = self._query(sql, params).set_index('row_id')
+        rows.index.name = None
+        return rows
+
+    def frame(self):
+        if self._frame is None:
+            self._frame = self._rows(
+                f"SELECT * EXCLUDE (\"Text\", cluster) FROM {self.table} WHERE {self.where} ORDER BY row_id"
+            )
+        return self._frame
+
+    def top(self, dimension, value, n=3, metric=DEFAULT_METRIC):
+        return self._rows(
+            f"SELECT * EXCLUDE (\"Text\", cluster) FROM {self.table} "
+            f"WHERE {self.where} AND {_quote(dimension)} = ? "
+            f"ORDER BY {_quote(metric)} DESC NULLS LAST, row_id LIMIT {int(n)}",
+            [value],
+        )
+
+
+def post_query(snapshot, filters, phrase='', collapse=False):
+    """Query over the posts of ``snapshot`` matching ``filters`` and ``phrase``.
+
+    With ``collapse``, near-duplicates among the matching posts are reduced to the
+    earliest post of each cluster.
+    """
+    backend = DuckDBPostQuery if use_duckdb() else PandasPostQuery
+    return backend(snapshot, filters, phrase, collapse)
+
+
+class PandasAdQuery:
+    def __init__(self, data, filters):
+        self.data = data[_mask(data, filters)]
+
+    def frame(self, start=None, end=None, columns=None):
+        data = self.data
+        if start is not None:
+            data = data[data['Reporting starts'] >= pd.to_datetime(start)]
+        if end is not None:
+            data = data[data['Reporting ends'] <= pd.to_datetime(end)]
+        return data if columns is None else data[columns]
+
+    def top(self, metric, n=10, start=None, end=None, columns=None):
+        top = self.frame(start, end).nlargest(n, metric)
+        return top if columns is None else top[columns]
+
+
+class DuckDBAdQuery:
+    def __init__(self, path, data, filters):
+        source = _columnar_file(dataset_name(path), data_version(path), lambda: data, ['Reporting starts'])
+        self.table = _table(source)
+        self.where, self.params = _where(filters)
+
+    def _select(self, columns, start, end, condition=None, order_limit=''):
+        clauses, params = [self.where], list(self.params)
+        if start is not None:
+            clauses.append('"Reporting starts" >= ?')
+            params.append(pd.to_datetime(start).to_pydatetime())
+        if end is not None:
+            clauses.append('"Reporting ends" <= ?')
+            params.append(pd.to_datetime(end).to_pydatetime())
+        if condition:
+            clauses.append(condition)
+        projection = ', '.join(_quote(column) for column in columns) if columns else '*'
+        sql = f"SELECT {projection} FROM {self.table} WHERE {' AND '.join(clauses)} {order_limit}"
+        return _cursor().execute(sql, params).df()
+
+    def frame(self, start=None, end=None, columns=None):
+        return self._select(columns, start, end)
+
+    def top(self, metric, n=10, start=None, end=None, columns=None):
+        return self._select(columns, start, end, f"{_quote(metric)} IS NOT NULL",
+                            f"ORDER BY {_quote(metric)} DESC LIMIT {int(n)}")
+
+
+def ad_query(path, data, filters):
+    """Query over the META ads in ``data`` (loaded from ``path``) matching ``filters``."""
+    if use_duckdb():
+        return DuckDBAdQuery(path, data, filters)
+    return PandasAdQuery(data, filters)
@@ -0,0 +1,269 @@
+"""Headless debrief reports, one static HTML page per Gruppe, Partei and Profil.
+
+Instead of clicking through the sidebar after each weekly export, run::
+
+    python -m debrief.report
+    python -m debrief.report --by Gruppe Partei --out reports/Jan25-18.02 --workers 8
+
+Each report has what the Instagram 2025 page shows for that selection, computed
+the same way: the best sentiment, emotion and politikfeld by the lower bound of
+their bootstrap interval, their top 3 posts, the daily trend charts and the word
+clouds. The newest export is loaded once; the reports are rendered by a process
+pool whose workers are forked from the loaded process, so they share its frame
+and the memory-mapped text store instead of loading their own. An index.html
+links all reports, and plotly.js is written next to them so they open offline.
+"""
+import argparse
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from debrief import charts, config, duplicates, stats
+from debrief.compact import expand_posts
+from debrief.loader import load_posts
+from debrief.query import post_query
+from debrief.watcher import Snapshot, latest_export, snapshot_version
+from debrief.wordclouds import render_wordcloud
+
+GROUP_COLUMNS = ['Gruppe', 'Partei', 'Profil']
+DIMENSIONS = ['sentiment', 'emotion', 'politikfeld']
+TRENDS = [
+    ('Anzahl Likes', 'Likes Over Time'),
+    ('Anzahl Kommentare', 'Comments Over Time'),
+    ('Reaktionen, Kommentare & Shares', 'Interactions Over Time'),
+    ('Post-Interaktionsrate', 'Interaction Rate Over Time'),
+]
+
+# Set in the parent before the pool forks, or by _init_worker where processes are spawned
+_snapshot = None
+
+
+def load_snapshot(path=None):
+    """Snapshot of ``path``, or of the newest export in the data directory."""
+    path = path or latest_export()
+    if path is None:
+        raise FileNotFoundError(f"No export found in {config.DATA_DIR}")
+    data, post_texts = load_posts(path)
+    return Snapshot(snapshot_version(path), path, data, post_texts)
+
+
+def _init_worker(path, collapse):
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = load_snapshot(path)
+        if collapse:
+            duplicates.index_snapshot(_snapshot)
+
+
+def slug(value):
+    return re.sub(r'[^\w-]+', '_', str(value)).strip('_') or 'empty'
+
+
+def selections(data, columns):
+    """``(column, value, file name)`` for every value of ``columns``, with unique file names."""
+    seen = set()
+    for column in columns:
+        for value in sorted(data[column].dropna().unique(), key=str):
+            name = base = f"{column}-{slug(value)}"
+            suffix = 1
+            while name in seen:
+                suffix += 1
+                name = f"{base}-{suffix}"
+            seen.add(name)
+            yield column, value, name
+
+
+def best_categories(frame):
+    """Per dimension the ranked intervals and the best category, or None when none is supported."""
+    best = {}
+    for dimension in DIMENSIONS:
+        ranked = stats.rank(stats.category_intervals(frame, dimension))
+        best[dimension] = (ranked, ranked.index[0] if not ranked.empty else None)
+    return best
+
+
+def daily_trends(frame):
+    """Daily totals of the counts and the mean interaction rate, by Datum."""
+    dated = frame.dropna(subset=['Datum'])
+    counts = [column for column, _ in TRENDS if column != 'Post-Interaktionsrate']
+    daily = dated.set_index('Datum').resample('D').agg({**{column: 'sum' for column in counts},
+                                                        'Post-Interaktionsrate': 'mean'})
+    return daily.reset_index()
+
+
+def _section(title, body):
+    return f"<section><h2>{html.escape(title)}</h2>{body}</section>"
+
+
+def _summary_html(best):
+    items = []
+    for dimension, (ranked, value) in best.items():
+        if value is None:
+            items.append(f"<li><b>{dimension.capitalize()}:</b> N/A (no category with at least "
+                         f"{config.MIN_SUPPORT} posts)</li>")
+        else:
+            row = ranked.loc[value]
+            items.append(f"<li><b>{dimension.capitalize()}:</b> {html.escape(str(value))} "
+                         f"(Avg. Interaction Rate: {row['mean']:.2f}, untere 95%-Grenze: {row['lower']:.2f}, "
+                         f"{int(row['n'])} Posts)</li>")
+    return f"<ul>{''.join(items)}</ul>"
+
+
+def _top_posts_html(snapshot, query, best):
+    columns = []
+    for dimension, (_, value) in best.items():
+        posts = []
+        if value is not None:
+            top = expand_posts(query.top(dimension, value))
+            for row_id, row in top.iterrows():
+                link = row.get('Link')
+                posts.append(
+                    f"<div class='post'><p><i>{html.escape(str(row['Profil']))}</i>, "
+                    f"Interaction Rate {row['Post-Interaktionsrate']:.2f}, Likes {row['Anzahl Likes']:.0f}"
+                    + (f", <a href='{html.escape(link)}'>Link</a>" if isinstance(link, str) else '')
+                    + f"</p><p>{html.escape(snapshot.post_texts.get(row_id))}</p></div>"
+                )
+        title = f"Top posts für {dimension.capitalize()} '{html.escape(str(value if value is not None else 'N/A'))}'"
+        columns.append(f"<div class='column'><h3>{title}</h3>{''.join(posts) or '<p>No posts found.</p>'}</div>")
+    return f"<div class='columns'>{''.join(columns)}</div>"
+
+
+def _trends_html(daily):
+    if daily.empty:
+        return "<p>No posts with a parseable Datum.</p>"
+    figures = [
+        charts.line(daily, 'Datum', column, title, {'Datum': 'Date', column: column})
+        for column, title in TRENDS
+    ]
+    return ''.join(f"<div class='chart'>{figure.to_html(full_html=False, include_plotlyjs=False)}</div>"
+                   for figure in figures)
+
+
+def _wordclouds_html(snapshot, frame, dimension, out_dir, name):
+    from PIL import Image
+
+    images = []
+    for label, rows in frame.groupby(dimension, sort=True, observed=True).groups.items():
+        text = snapshot.post_texts.join(rows)
+        try:
+            image = render_wordcloud(text)
+        except ValueError:
+            # No words left after the stopwords, e.g. only emojis
+            continue
+        file_name = f"{name}-wordcloud-{slug(label)}.png"
+        Image.fromarray(image).save(os.path.join(out_dir, file_name))
+        images.append(f"<figure><img src='{file_name}' alt='Word cloud'>"
+                      f"<figcaption>{html.escape(str(label))}</figcaption></figure>")
+    return ''.join(images) or "<p>No texts for a word cloud.</p>"
+
+
+PAGE = """<!DOCTYPE html>
+<html lang="de"><head><meta charset="utf-8"><title>{title}</title>
+<script src="plotly.min.js"></script>
+<style>
+body {{ font-family: sans-serif; margin: 2em auto; max-width: 1400px; }}
+.columns {{ display: grid; grid-template-columns: repeat(3, 1fr); gap: 1.5em; }}
+.post {{ border-bottom: 1px solid #ddd; }}
+.chart {{ display: inline-block; width: 49%; }}
+figure {{ display: inline-block; margin: 0 1em 1em 0; }}
+figure img {{ width: 600px; }}
+</style></head>
+<body><p><a href="index.html">All reports</a></p>{body}</body></html>
+"""
+
+
+def render_report(column, value, name, out_dir, collapse=False, wordcloud_by='sentiment'):
+    """Write the report for ``column == value`` to ``out_dir/name.html``; returns its post count."""
+    snapshot = _snapshot
+    query = post_query(snapshot, {column: [value]}, collapse=collapse)
+    frame = query.frame()
+    title = f"{column}: {value}"
+    body = [f"<h1>{html.escape(title)}</h1>",
+            f"<p>Export: {html.escape(snapshot.path)}, {len(frame)} Posts"
+            + (", near-duplicates collapsed" if collapse else '') + "</p>"]
+    best = best_categories(frame)
+    body.append(_section("Zusammenfassung", _summary_html(best)))
+    body.append(_section("Top Posts", _top_posts_html(snapshot, query, best)))
+    body.append(_section("Visualizations", _trends_html(daily_trends(frame))))
+    body.append(_section(f"Word Clouds by {wordcloud_by.capitalize()}",
+                         _wordclouds_html(snapshot, frame.dropna(subset=['Datum']), wordcloud_by, out_dir, name)))
+    with open(os.path.join(out_dir, f"{name}.html"), 'w', encoding='utf-8') as f:
+        f.write(PAGE.format(title=html.escape(title), body=''.join(body)))
+    return len(frame)
+
+
+def write_index(out_dir, snapshot, rendered):
+    sections = []
+    for column in dict.fromkeys(column for column, _, _, _ in rendered):
+        rows = ''.join(
+            f"<tr><td><a href='{name}.html'>{html.escape(str(value))}</a></td><td>{posts}</td></tr>"
+            for row_column, value, name, posts in rendered if row_column == column
+        )
+        sections.append(_section(column, f"<table><tr><th>{column}</th><th>Posts</th></tr>{rows}</table>"))
+    body = f"<h1>Debrief</h1><p>Export: {html.escape(snapshot.path)}</p>{''.join(sections)}"
+    with open(os.path.join(out_dir, 'index.html'), 'w', encoding='utf-8') as f:
+        f.write(PAGE.format(title='Debrief', body=body).replace('<p><a href="index.html">All reports</a></p>', ''))
+
+
+def run(columns=None, out_dir=None, workers=None, path=None, collapse=False, wordcloud_by='sentiment'):
+    """Render the reports of every value of ``columns``; returns ``(column, value, name, posts)`` rows."""
+    global _snapshot
+    from plotly.offline import get_plotlyjs
+
+    columns = columns or GROUP_COLUMNS
+    _snapshot = snapshot = load_snapshot(path)
+    if collapse:
+        # Clustered once here rather than in every worker
+        duplicates.index_snapshot(snapshot)
+    out_dir = out_dir or os.path.join('reports', os.path.splitext(os.path.basename(snapshot.path))[0])
+    os.makedirs(out_dir, exist_ok=True)
+    with open(os.path.join(out_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+        f.write(get_plotlyjs())
+
+    tasks = list(selections(snapshot.data, columns))
+    # Forked workers start with the loaded snapshot; elsewhere _init_worker loads it once per worker
+    context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+    rendered = []
+    with ProcessPoolExecutor(max_workers=workers or config.WORDCLOUD_WORKERS, mp_context=context,
+                             initializer=_init_worker, initargs=(snapshot.path, collapse)) as pool:
+        futures = {pool.submit(render_report, column, value, name, out_dir, collapse, wordcloud_by):
+                   (column, value, name) for column, value, name in tasks}
+        for done, future in enumerate(as_completed(futures), 1):
+            column, value, name = futures[future]
+            try:
+                posts = future.result()
+            except Exception as error:
+                print(f"[{done}/{len(tasks)}] {column} {value}: failed ({error!r})", file=sys.stderr)
+                continue
+            rendered.append((column, value, name, posts))
+            print(f"[{done}/{len(tasks)}] {column} {value}: {posts} posts")
+    rendered.sort(key=lambda row: (columns.index(row[0]), str(row[1])))
+    write_index(out_dir, snapshot, rendered)
+    return rendered, out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--by', nargs='+', choices=GROUP_COLUMNS, default=GROUP_COLUMNS,
+                        help="columns to write one report per value of")
+    parser.add_argument('--out', help="output directory (default: reports/<export name>)")
+    parser.add_argument('--workers', type=int, help="rendering processes (default: DEBRIEF_WORDCLOUD_WORKERS)")
+    parser.add_argument('--export', help="export to report on (default: the newest in DEBRIEF_DATA_DIR)")
+    parser.add_argument('--collapse', action='store_true', help="count near-duplicate posts once")
+    parser.add_argument('--wordcloud-by', choices=DIMENSIONS, default='sentiment')
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    rendered, out_dir = run(args.by, args.out, args.workers, args.export, args.collapse, args.wordcloud_by)
+    print(f"{len(rendered)} reports in {os.path.join(out_dir, 'index.html')} "
+          f"({time.perf_counter() - started:.0f}s)")
+    total = sum(1 for _ in selections(_snapshot.data, args.by))
+    return 0 if len(rendered) == total else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
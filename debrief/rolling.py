@@ -0,0 +1,194 @@
+"""Trailing-window engagement per Gruppe or Profil, from cumulative daily sums.
+
+Each group keeps, per calendar day, the number of posts and the sum and count
+of every metric, accumulated along the days into one ``(groups, days, columns)``
+array. The sum over any trailing window is then a single subtraction of that
+array and its copy shifted by the window, so every window (3, 7, 14 days) of
+every metric and group comes out of one vectorised pass. Dividing the window's
+metric sum by its count weights each post equally, instead of averaging the
+means of busy and quiet days alike.
+
+A new export mostly adds days at the end. ``update`` compares the export's
+daily sums with the ones held and only re-accumulates from the first day that
+changed, and the window means are recomputed from that day on. The engines for
+the unfiltered data are carried from one snapshot to the next by an ingest hook.
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+METRICS = ['Anzahl Likes', 'Anzahl Kommentare', 'Reaktionen, Kommentare & Shares', 'Post-Interaktionsrate']
+WINDOWS = (3, 7, 14)
+GROUP_COLUMNS = ['Gruppe', 'Profil']
+
+# Engines of the snapshots currently being served (the newest two), by group column
+KEEP_ENGINES = 2
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+class RollingMetrics:
+    """Post-weighted trailing-window means of ``metrics`` per value of ``group``."""
+
+    def __init__(self, group, metrics=METRICS):
+        self.group = group
+        self.metrics = list(metrics)
+        self.groups = pd.Index([], dtype=object)
+        self.start = None
+        # Column 0 counts the posts, then the sum and the count of each metric
+        self._cumsum = np.zeros((0, 0, 1 + 2 * len(self.metrics)))
+        # window -> (groups, days, 1 + metrics) array of post counts and means
+        self._means = {}
+
+    @classmethod
+    def from_posts(cls, posts, group, metrics=METRICS):
+        rolling = cls(group, metrics)
+        rolling.update(posts)
+        return rolling
+
+    def copy(self):
+        rolling = RollingMetrics(self.group, self.metrics)
+        rolling.groups, rolling.start = self.groups, self.start
+        rolling._cumsum = self._cumsum.copy()
+        rolling._means = {window: means.copy() for window, means in self._means.items()}
+        return rolling
+
+    @property
+    def days(self):
+        return pd.date_range(self.start, periods=self._cumsum.shape[1], freq='D') if self.start is not None \
+            else pd.DatetimeIndex([])
+
+    def _extend(self, groups, first, last):
+        # Grow the array to new groups and to days before or after the ones held
+        new_groups = groups.difference(self.groups, sort=False)
+        if len(new_groups):
+            self.groups = self.groups.append(new_groups)
+        start = first if self.start is None else min(self.start, first)
+        end = last if self.start is None else max(self.start + pd.Timedelta(days=self._cumsum.shape[1] - 1), last)
+        before = 0 if self.start is None else (self.start - start).days
+        after = (end - start).days + 1 - before - self._cumsum.shape[1]
+        cumsum = np.pad(self._cumsum, ((0, len(new_groups)), (before, 0), (0, 0)))
+        if after:
+            # Days after the last one carry its cumulative sums forward
+            tail = cumsum[:, -1:] if cumsum.shape[1] else np.zeros((len(self.groups), 1, cumsum.shape[2]))
+            cumsum = np.concatenate([cumsum, np.repeat(tail, after, axis=1)], axis=1)
+        self._cumsum, self.start = cumsum, start
+        for window, means in self._means.items():
+            means = np.pad(means, ((0, len(new_groups)), (before, after), (0, 0)), constant_values=np.nan)
+            self._means[window] = means
+        return before
+
+    def _daily_sums(self, posts):
+        dated = posts.dropna(subset=['Datum', self.group])
+        groups, days, columns = self._cumsum.shape
+        codes = pd.Categorical(dated[self.group].astype(object), categories=self.groups).codes
+        offsets = (dated['Datum'].dt.normalize() - self.start).dt.days.to_numpy()
+        cells = codes.astype(np.int64) * days + offsets
+        values = dated[self.metrics].to_numpy(dtype=np.float64)
+        weights = [np.ones(len(dated))]
+        for column in values.T:
+            present = ~np.isnan(column)
+            weights += [np.where(present, column, 0), present.astype(np.float64)]
+        return np.stack([np.bincount(cells, weights=weight, minlength=groups * days) for weight in weights],
+                        axis=-1).reshape(groups, days, columns)
+
+    def _accumulate(self, daily, first_day):
+        base = self._cumsum[:, first_day - 1:first_day] if first_day else 0
+        self._cumsum[:, first_day:] = base + np.cumsum(daily[:, first_day:], axis=1)
+        for window in self._means:
+            self._means[window][:, first_day:] = self._window_means(self._cumsum, window, first_day)
+
+    def _span(self, posts):
+        dated = posts.dropna(subset=['Datum', self.group])
+        if dated.empty:
+            return None
+        days = dated['Datum'].dt.normalize()
+        groups = pd.Index(dated[self.group].astype(object).unique())
+        return self._extend(groups, days.min(), days.max())
+
+    def update(self, posts):
+        """Make the sums those of ``posts``, all current posts; returns the first day that changed, or None."""
+        self._span(posts)
+        if self.start is None:
+            return None
+        daily = self._daily_sums(posts)
+        held = np.diff(self._cumsum, axis=1, prepend=0)
+        # Re-accumulated sums of rates differ from the fresh ones in the last bits
+        changed = np.flatnonzero((~np.isclose(daily, held, rtol=1e-9, atol=1e-9)).any(axis=(0, 2)))
+        if not len(changed):
+            return None
+        self._accumulate(daily, changed[0])
+        return self.days[changed[0]]
+
+    def add(self, posts):
+        """Add ``posts`` that are not counted yet, e.g. the posts of a new day."""
+        if self._span(posts) is None:
+            return None
+        daily = self._daily_sums(posts)
+        touched = np.flatnonzero(daily.any(axis=(0, 2)))
+        self._accumulate(np.diff(self._cumsum, axis=1, prepend=0) + daily, touched[0])
+        return self.days[touched[0]]
+
+    def _window_means(self, cumsum, window, first_day=0):
+        lag = np.arange(first_day, cumsum.shape[1]) - window
+        lagged = np.where((lag >= 0)[None, :, None], cumsum[:, np.maximum(lag, 0)], 0)
+        sums = cumsum[:, first_day:] - lagged
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums[..., 1::2] / sums[..., 2::2]
+        return np.concatenate([sums[..., :1], means], axis=-1)
+
+    def means(self, window):
+        """``(groups, days, 1 + metrics)`` array: posts in the window ending on each day, then the metric means."""
+        if window not in self._means:
+            self._means[window] = self._window_means(self._cumsum, window)
+        return self._means[window]
+
+    def frame(self, windows=WINDOWS, total=False):
+        """Long frame of ``group``, ``Date``, ``window``, ``posts`` and the metric means.
+
+        With ``total`` all groups are summed into one line. Days on which a window
+        holds no posts are left out.
+        """
+        frames = []
+        for window in windows:
+            if total:
+                means = self._window_means(self._cumsum.sum(axis=0, keepdims=True), window)
+                labels = ['All']
+            else:
+                means = self.means(window)
+                labels = self.groups
+            groups, days, _ = means.shape
+            frame = pd.DataFrame(means.reshape(groups * days, -1), columns=['posts', *self.metrics])
+            frame.insert(0, self.group, np.repeat(np.asarray(labels, dtype=object), days))
+            frame.insert(1, 'Date', np.tile(self.days.to_numpy(), groups))
+            frame.insert(2, 'window', f"{window} days")
+            frames.append(frame[frame['posts'] > 0])
+        if not frames:
+            return pd.DataFrame(columns=[self.group, 'Date', 'window', 'posts', *self.metrics])
+        return pd.concat(frames, ignore_index=True)
+
+
+def index_snapshot(snapshot):
+    """Ingest hook: bring the engines of the previous snapshot up to ``snapshot``."""
+    with _engines_lock:
+        previous = next(reversed(_engines.values()), None)
+    engines = {}
+    for group in GROUP_COLUMNS:
+        if previous is not None:
+            engines[group] = previous[group].copy()
+            engines[group].update(snapshot.data)
+        else:
+            engines[group] = RollingMetrics.from_posts(snapshot.data, group)
+    with _engines_lock:
+        _engines[snapshot.version] = engines
+        for version in list(_engines)[:-KEEP_ENGINES]:
+            del _engines[version]
+    return engines
+
+
+def rolling_metrics(snapshot, group):
+    """The engine of the unfiltered posts of ``snapshot`` per ``group``."""
+    with _engines_lock:
+        engines = _engines.get(snapshot.version)
+    return (engines if engines is not None else index_snapshot(snapshot))[group]
@@ -0,0 +1,119 @@
+"""Typed tables published once per host and attached read-only by every replica.
+
+Each table is an Arrow IPC file ``<name>-<version>.arrow`` in the shared directory,
+with ``<name>.version`` naming the current one. Replicas memory-map the file, so
+numeric columns are served zero-copy from the page cache instead of each process
+holding its own parsed copy. A new version is written beside the old one and the
+version file is swapped by rename, so readers see either the old or the new table.
+"""
+import contextlib
+import fcntl
+import os
+
+import pyarrow as pa
+
+from debrief import config
+
+# Versions older than this many are removed on publish; open mappings stay valid
+KEEP_VERSIONS = 2
+
+
+def _path(name, suffix):
+    return os.path.join(config.SHARED_DIR, f"{name}{suffix}")
+
+
+@contextlib.contextmanager
+def locked(name):
+    """Hold the host-wide lock under which ``name`` is published."""
+    os.makedirs(config.SHARED_DIR, exist_ok=True)
+    with open(_path(name, '.lock'), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def current_version(name):
+    """The published version of ``name``, or 0 if nothing was published yet."""
+    try:
+        with open(_path(name, '.version')) as f:
+            return int(f.read())
+    except (OSError, ValueError):
+        return 0
+
+
+def _to_arrow(frame, metadata):
+    arrays = []
+    for column in frame.columns:
+        values = frame[column]
+        if values.dtype.kind in 'biuf':
+            # Keep NaN as a value rather than a null, so floats read back without a copy
+            arrays.append(pa.array(values.to_numpy(), from_pandas=False))
+        else:
+            arrays.append(pa.Array.from_pandas(values))
+    metadata = {key: str(value) for key, value in (metadata or {}).items()}
+    return pa.Table.from_arrays(arrays, names=[str(column) for column in frame.columns], metadata=metadata)
+
+
+def _publish_locked(name, frame, metadata):
+    version = current_version(name) + 1
+    table = _to_arrow(frame, metadata)
+    target = _path(name, f"-{version}.arrow")
+    with pa.OSFile(f"{target}.tmp", 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(f"{target}.tmp", target)
+
+    with open(_path(name, '.version.tmp'), 'w') as f:
+        f.write(str(version))
+    os.replace(_path(name, '.version.tmp'), _path(name, '.version'))
+
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(_path(name, f"-{version - KEEP_VERSIONS}.arrow"))
+    return version
+
+
+def publish(name, frame, metadata=None):
+    """Write ``frame`` as the next version of ``name`` and return that version."""
+    with locked(name):
+        return _publish_locked(name, frame, metadata)
+
+
+def attach(name, version=None):
+    """Memory-map a published version of ``name`` (the current one by default).
+
+    Returns the read-only frame and the metadata it was published with.
+    """
+    version = version or current_version(name)
+    source = pa.memory_map(_path(name, f"-{version}.arrow"), 'r')
+    table = pa.ipc.open_file(source).read_all()
+    frame = table.to_pandas(split_blocks=True, zero_copy_only=False)
+    metadata = {key.decode(): value.decode() for key, value in (table.schema.metadata or {}).items()}
+    return frame, metadata
+
+
+def _attach_if_current(name, stamp):
+    if current_version(name):
+        frame, metadata = attach(name)
+        if metadata.get('source_mtime') == stamp:
+            return frame
+    return None
+
+
+def load_shared(name, source, build):
+    """Attach ``name`` as published from ``source``, publishing ``build()`` first if stale.
+
+    Only one process per host runs ``build``; the others wait on the lock and attach
+    the table it published.
+    """
+    stamp = str(os.path.getmtime(source))
+    frame = _attach_if_current(name, stamp)
+    if frame is not None:
+        return frame
+    with locked(name):
+        frame = _attach_if_current(name, stamp)
+        if frame is None:
+            _publish_locked(name, build(), {'source': source, 'source_mtime': stamp})
+            frame = attach(name)[0]
+    return frame
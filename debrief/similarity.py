@@ -0,0 +1,174 @@
+"""Content similarity of profiles and parties from hashed TF-IDF vectors.
+
+Every post is tokenised once, during ingest, into a sparse row of term counts.
+Terms are hashed into ``FEATURES`` columns, so there is no vocabulary to refit
+when new words appear. Per ``Profil`` and per ``Partei`` the index keeps the
+summed term counts of their posts, a group x term matrix, next to the number of
+posts using each term. TF-IDF weights the log of a group's term counts by the
+inverse document frequency over the posts, and with rows scaled to unit length
+the cosine similarity of all groups is the sparse product ``X @ X.T``.
+
+A new snapshot only tokenises and adds the posts the index has not counted yet,
+identified by Beitrag-ID and text. The IDF changes with every post, so the
+TF-IDF rows and the product are recomputed, which takes milliseconds for
+hundreds of profiles. If posts were removed or edited, the index is rebuilt.
+"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from debrief.classify import text_hashes
+
+FEATURES = 2 ** 18
+WORD = re.compile(r'[^\W\d_]{3,}')
+GROUP_COLUMNS = ['Profil', 'Partei']
+
+# Frequent German and English words that say nothing about the topic of a post
+STOPWORDS = frozenset("""
+aber alle allem allen aller alles als also auch auf aus bei beim bin bis bist dann das dass dem den der des
+die dies diese diesem diesen dieser dieses doch dort durch ein eine einem einen einer eines euch eure für
+gegen gibt hab habe haben hat hatte hier hin ich ihr ihre ihrem ihren ihrer immer ist jetzt kann kein keine
+können mal man mehr mein meine mit muss müssen nach nicht nichts noch nun nur oder ohne sehr sein seine
+sich sie sind soll sollen sondern über uns unser unsere unserer unter viel vom von vor war waren was weil
+wenn wer werden wie wieder will wir wird wurde zum zur zwischen schon heute beim euer eurer eures sowie
+and are but can for from has have into just more not our that the their there this with you your was were
+""".split())
+
+# Indexes of the snapshots currently being served (the newest two), by group column
+KEEP_INDEXES = 2
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def post_terms(texts):
+    """Hashed term counts of ``texts`` as a sparse post x ``FEATURES`` matrix, and the term of each feature."""
+    rows, tokens = [], []
+    for row, text in enumerate(texts):
+        words = [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+        rows.extend([row] * len(words))
+        tokens.extend(words)
+    tokens = np.asarray(tokens, dtype=object)
+    features = (pd.util.hash_array(tokens) % FEATURES).astype(np.int64) if len(tokens) else np.zeros(0, np.int64)
+    # Duplicate (post, feature) pairs are summed into counts
+    matrix = sparse.csr_matrix((np.ones(len(rows)), (rows, features)), shape=(len(texts), FEATURES))
+    names = dict(zip(features.tolist(), tokens.tolist()))
+    return matrix, names
+
+
+def post_keys(data, post_texts):
+    """Identity of each post of ``data`` for the index: its Beitrag-ID and the hash of its text."""
+    hashes = text_hashes(pd.Series(post_texts.get_many(data.index), index=data.index, dtype=object))
+    frame = pd.DataFrame({'id': data['Beitrag-ID'].astype(str), 'text': hashes})
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+class SimilarityIndex:
+    """Summed hashed term counts per value of ``group``, with document frequencies over the posts."""
+
+    def __init__(self, group):
+        self.group = group
+        self.groups = pd.Index([], dtype=object)
+        self.counts = sparse.csr_matrix((0, FEATURES))
+        self.posts = np.zeros(0, dtype=np.int64)
+        self.document_frequency = np.zeros(FEATURES, dtype=np.int64)
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.names = {}
+        self._tfidf = None
+
+    def copy(self):
+        index = SimilarityIndex(self.group)
+        index.groups, index.counts, index.posts = self.groups, self.counts.copy(), self.posts.copy()
+        index.document_frequency, index.keys = self.document_frequency.copy(), self.keys
+        index.names = dict(self.names)
+        return index
+
+    def add(self, terms, names, groups, keys):
+        """Count the posts with term rows ``terms``, group labels ``groups`` and identities ``keys``."""
+        groups = pd.Series(groups, dtype=object).reset_index(drop=True)
+        valid = groups.notna().to_numpy()
+        new_groups = pd.Index(groups[valid].unique()).difference(self.groups, sort=False)
+        if len(new_groups):
+            self.groups = self.groups.append(new_groups)
+            self.counts = sparse.vstack([self.counts, sparse.csr_matrix((len(new_groups), FEATURES))]).tocsr()
+            self.posts = np.concatenate([self.posts, np.zeros(len(new_groups), dtype=np.int64)])
+        codes = self.groups.get_indexer(groups[valid])
+        indicator = sparse.csr_matrix((np.ones(len(codes)), (codes, np.flatnonzero(valid))),
+                                      shape=(len(self.groups), terms.shape[0]))
+        self.counts = (self.counts + indicator @ terms).tocsr()
+        self.posts += np.bincount(codes, minlength=len(self.groups))
+        self.document_frequency += np.diff((terms > 0).tocsc().indptr)
+        self.keys = np.union1d(self.keys, keys)
+        self.names.update(names)
+        self._tfidf = None
+
+    def tfidf(self):
+        """Unit-length TF-IDF rows of the groups, sublinear in the term counts."""
+        if self._tfidf is None:
+            idf = np.log((1 + len(self.keys)) / (1 + self.document_frequency)) + 1
+            weights = self.counts.copy()
+            weights.data = np.log1p(weights.data)
+            weights = weights @ sparse.diags(idf)
+            norms = np.sqrt(np.asarray(weights.multiply(weights).sum(axis=1)).ravel())
+            self._tfidf = (sparse.diags(1 / np.where(norms > 0, norms, 1)) @ weights).tocsr()
+        return self._tfidf
+
+    def similarity(self, groups=None):
+        """Cosine similarity of ``groups`` (default: all) as a square frame."""
+        groups = self.groups if groups is None else pd.Index(groups, dtype=object)
+        rows = self.tfidf()[self.groups.get_indexer(groups)]
+        return pd.DataFrame((rows @ rows.T).toarray(), index=groups, columns=groups)
+
+    def nearest(self, group, n=10):
+        """The ``n`` groups most similar to ``group``, most similar first."""
+        tfidf = self.tfidf()
+        row = tfidf[self.groups.get_indexer([group])]
+        similarity = pd.Series((row @ tfidf.T).toarray().ravel(), index=self.groups).drop(group)
+        return similarity.nlargest(n)
+
+    def shared_terms(self, first, second, n=15):
+        """Terms contributing most to the similarity of ``first`` and ``second``."""
+        rows = self.tfidf()[self.groups.get_indexer([first, second])]
+        contribution = rows[0].multiply(rows[1]).tocoo()
+        top = np.argsort(contribution.data)[::-1][:n]
+        return pd.Series(contribution.data[top], index=[self.names.get(feature, '?')
+                                                        for feature in contribution.col[top]], name='weight')
+
+
+def _build(snapshot, group, terms, names, keys):
+    index = SimilarityIndex(group)
+    index.add(terms, names, snapshot.data[group].to_numpy(), keys)
+    return index
+
+
+def index_snapshot(snapshot):
+    """Ingest hook: add the new posts of ``snapshot`` to the indexes of the previous one."""
+    data = snapshot.data
+    keys = post_keys(data, snapshot.post_texts)
+    with _indexes_lock:
+        previous = next(reversed(_indexes.values()), None)
+    if previous is not None and np.isin(previous[GROUP_COLUMNS[0]].keys, keys).all():
+        new = ~np.isin(keys, previous[GROUP_COLUMNS[0]].keys)
+        terms, names = post_terms(snapshot.post_texts.get_many(data.index[new]))
+        indexes = {}
+        for group in GROUP_COLUMNS:
+            indexes[group] = previous[group].copy()
+            indexes[group].add(terms, names, data[group].to_numpy()[new], keys[new])
+    else:
+        # First snapshot, or posts were removed or edited since the last one
+        terms, names = post_terms(snapshot.post_texts.get_many(data.index))
+        indexes = {group: _build(snapshot, group, terms, names, keys) for group in GROUP_COLUMNS}
+    with _indexes_lock:
+        _indexes[snapshot.version] = indexes
+        for version in list(_indexes)[:-KEEP_INDEXES]:
+            del _indexes[version]
+    return indexes
+
+
+def similarity_index(snapshot, group):
+    """The index of ``snapshot`` per ``group``, built now if the ingest hook did not run for it."""
+    with _indexes_lock:
+        indexes = _indexes.get(snapshot.version)
+    return (indexes if indexes is not None else index_snapshot(snapshot))[group]
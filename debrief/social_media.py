@@ -0,0 +1,95 @@
+"""The cross-platform export as a store partitioned by platform and year.
+
+``processing.ipynb`` merges the Instagram, Facebook, Twitter, LinkedIn, TikTok and
+YouTube exports into ``all_content.csv``. Dropped into ``pages/data`` it is converted
+into two Hive-partitioned Parquet datasets under the cache directory::
+
+    social_media/rows/Platform=Instagram/year=2024/...
+    social_media/summary/Platform=Instagram/year=2024/...
+
+``summary`` holds the post count and metric sums per day and profile for every
+partition, which is all the overview charts need unless a phrase is searched.
+Posts whose date could not be parsed are kept under ``year=0``.
+"""
+import os
+
+import pandas as pd
+import pyarrow as pa
+
+from debrief import config, partitioned
+
+PARTITION_SCHEMA = [('Platform', pa.string()), ('year', pa.int32())]
+METRICS = ['Anzahl Likes', 'Anzahl Kommentare', 'Gesamtanzahl Reaktionen, Kommentare & Shares']
+RATE = 'Post-Interaktionsrate'
+ROW_COLUMNS = ['Datum', 'Profil', 'Nachricht', *METRICS, RATE]
+UNDATED = 0
+
+
+def store_dir():
+    return os.path.join(config.CACHE_DIR, 'social_media')
+
+
+def source_path(data_dir=None):
+    return os.path.join(data_dir or config.DATA_DIR, 'all_content.csv')
+
+
+def source_version(data_dir=None):
+    """Changes whenever the export is added or replaced."""
+    path = source_path(data_dir)
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+
+def read_export(path):
+    data = pd.read_csv(path)
+    data.columns = data.columns.str.strip()
+    # Same cleaning the overview page always did
+    for column in METRICS:
+        data[column] = data[column].astype(str).str.replace(',', '').pipe(pd.to_numeric, errors='coerce')
+    data[RATE] = pd.to_numeric(data[RATE].astype(str).str.rstrip('%').str.replace(',', '.'), errors='coerce')
+    data['Datum'] = pd.to_datetime(data['Datum'], format='%d.%m.%y, %H:%M', errors='coerce')
+    data['Platform'] = data['Platform'].fillna('Unknown').astype(str)
+    data['year'] = data['Datum'].dt.year.fillna(UNDATED).astype('int32')
+    return data.reindex(columns=[*ROW_COLUMNS, 'Platform', 'year'])
+
+
+def summarize(rows):
+    """Post count and metric sums per platform, year, day and profile."""
+    rows = rows.assign(Day=rows['Datum'].dt.normalize(), posts=1, rate_posts=rows[RATE].notna().astype('int64'))
+    columns = ['posts', *METRICS, RATE, 'rate_posts']
+    return rows.groupby(['Platform', 'year', 'Day', 'Profil'], as_index=False, dropna=False)[columns].sum(min_count=1)
+
+
+def ensure_store(data_dir=None):
+    """Build the store unless it is up to date with the export; returns its version."""
+    version = repr(source_version(data_dir))
+    if partitioned.read_version(store_dir()) != version:
+        build_store(data_dir)
+        partitioned.write_version(store_dir(), version)
+    return version
+
+
+def build_store(data_dir=None):
+    """(Re)build the partitioned store from ``all_content.csv`` in ``data_dir``."""
+    building = partitioned.building_dir(store_dir())
+    path = source_path(data_dir)
+    if os.path.exists(path):
+        rows = read_export(path)
+        partitioned.write(rows, os.path.join(building, 'rows'), ['Platform', 'year'])
+        partitioned.write(summarize(rows), os.path.join(building, 'summary'), ['Platform', 'year'])
+    partitioned.swap_in(building, store_dir())
+
+
+def partitions():
+    """``(Platform, year)`` pairs present in the store, from the directory names only."""
+    return [(platform, int(year))
+            for platform, year in partitioned.partitions(os.path.join(store_dir(), 'summary'))]
+
+
+def read_summary(platforms, years, columns=None):
+    return partitioned.read(os.path.join(store_dir(), 'summary'), PARTITION_SCHEMA,
+                            {'Platform': platforms, 'year': years}, columns)
+
+
+def read_rows(platforms, years, columns=None):
+    return partitioned.read(os.path.join(store_dir(), 'rows'), PARTITION_SCHEMA,
+                            {'Platform': platforms, 'year': years}, columns)
@@ -0,0 +1,118 @@
+"""Hashtags and @mentions of the posts as sparse post x tag matrices.
+
+The index is built once per snapshot, during ingest, from the text store. Rows
+are the store's row ids, which are also the index of the working frame, so every
+query takes the rows of the filtered frame and works on that row subset: counts
+are column sums, co-occurrence is ``X.T @ X`` and the mean engagement per tag is
+``X.T @ metric / counts``.
+"""
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+HASHTAG = re.compile(r'#(\w*[^\W\d_]\w*)')
+MENTION = re.compile(r'@(\w+(?:\.\w+)*)')
+
+# Indexes of the snapshots currently being served (the newest two)
+KEEP_INDEXES = 2
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+class TagMatrix:
+    """Presence of each tag (column) in each post (row)."""
+
+    def __init__(self, matrix, names):
+        self.matrix = matrix
+        self.names = pd.Index(names, dtype=object)
+
+    @classmethod
+    def extract(cls, texts, pattern, prefix):
+        rows, columns, vocabulary = [], [], {}
+        count = 0
+        for row, text in enumerate(texts):
+            count += 1
+            # Case-insensitive, and counted once per post
+            for tag in {match.lower() for match in pattern.findall(text)}:
+                rows.append(row)
+                columns.append(vocabulary.setdefault(tag, len(vocabulary)))
+        matrix = sparse.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, columns)),
+                                   shape=(count, len(vocabulary)))
+        return cls(matrix, [prefix + tag for tag in vocabulary])
+
+    def subset(self, rows):
+        return self.matrix[np.asarray(rows, dtype=np.int64)]
+
+    def counts(self, rows):
+        """Number of posts among ``rows`` using each tag, most used first."""
+        counts = np.asarray(self.subset(rows).sum(axis=0)).ravel()
+        return pd.Series(counts, index=self.names).loc[lambda counts: counts > 0].sort_values(ascending=False)
+
+    def top(self, rows, n=10):
+        return self.counts(rows).head(n).astype(int)
+
+    def top_by(self, rows, groups, n=5):
+        """Top ``n`` tags per value of ``groups`` (aligned to ``rows``), as a long frame."""
+        codes, labels = pd.factorize(pd.Series(groups), sort=True)
+        valid = codes >= 0
+        # groups x rows indicator times rows x tags: counts per group in one product
+        indicator = sparse.csr_matrix((np.ones(valid.sum(), dtype=np.float32),
+                                       (codes[valid], np.flatnonzero(valid))),
+                                      shape=(len(labels), len(codes)))
+        counts = (indicator @ self.subset(rows)).toarray()
+        frames = []
+        for group, row in zip(labels, counts):
+            best = np.argsort(-row, kind='stable')[:n]
+            best = best[row[best] > 0]
+            frames.append(pd.DataFrame({'group': group, 'tag': self.names[best], 'posts': row[best].astype(int)}))
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['group', 'tag', 'posts'])
+
+    def cooccurrence(self, rows, n=15):
+        """Posts among ``rows`` sharing each pair of the ``n`` most used tags."""
+        top = self.counts(rows).head(n)
+        subset = self.subset(rows)[:, self.names.get_indexer(top.index)]
+        return pd.DataFrame((subset.T @ subset).toarray().astype(int), index=top.index, columns=top.index)
+
+    def mean_engagement(self, rows, values, min_posts=3):
+        """Mean of ``values`` (aligned to ``rows``) over the posts using each tag."""
+        values = np.asarray(values, dtype=np.float64)
+        # Posts without a value count neither towards the sum nor the number of posts
+        valid = ~np.isnan(values)
+        subset = self.subset(rows)[valid]
+        counts = np.asarray(subset.sum(axis=0)).ravel()
+        sums = subset.T @ values[valid]
+        keep = counts >= min_posts
+        means = pd.DataFrame({'posts': counts[keep].astype(int), 'mean': sums[keep] / counts[keep]},
+                             index=self.names[keep])
+        return means.sort_values('mean', ascending=False)
+
+
+class TagIndex:
+    def __init__(self, hashtags, mentions):
+        self.hashtags = hashtags
+        self.mentions = mentions
+
+    @classmethod
+    def build(cls, post_texts):
+        texts = [post_texts.get(row_id) for row_id in range(len(post_texts))]
+        return cls(TagMatrix.extract(texts, HASHTAG, '#'), TagMatrix.extract(texts, MENTION, '@'))
+
+
+def index_snapshot(snapshot):
+    """Ingest hook: build the index of ``snapshot`` before it is served."""
+    index = TagIndex.build(snapshot.post_texts)
+    with _indexes_lock:
+        _indexes[snapshot.version] = index
+        for version in list(_indexes)[:-KEEP_INDEXES]:
+            del _indexes[version]
+    return index
+
+
+def tag_index(snapshot):
+    """The index of ``snapshot``, built now if the ingest hook did not run for it."""
+    with _indexes_lock:
+        index = _indexes.get(snapshot.version)
+    return index if index is not None else index_snapshot(snapshot)
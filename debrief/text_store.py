@@ -0,0 +1,101 @@
+"""Post bodies kept out of the working frames, in a memory-mapped UTF-8 blob."""
+import contextlib
+import os
+import re
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class TextStore:
+    """Read-only texts addressed by row id.
+
+    On disk a store is ``<path>.offsets.npz``, holding the ``n + 1`` byte offsets
+    and the name of its blob, next to that blob ``<path>.<random>.blob`` (all texts
+    concatenated as UTF-8). The blob is memory-mapped, so sessions and processes on
+    the same host share its pages through the OS cache. Every build writes a blob
+    of its own and replaces the offsets file last, so a reader always gets offsets
+    and a blob that belong together, however many processes build at once.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        for attempt in range(3):
+            offsets, blob = self._read_offsets(path)
+            try:
+                size = os.path.getsize(blob)
+                self.blob = np.memmap(blob, dtype=np.uint8, mode='r') if size else np.empty(0, dtype=np.uint8)
+                break
+            except FileNotFoundError:
+                # A new build replaced the store between the two reads
+                if attempt == 2:
+                    raise
+        self.offsets = offsets
+
+    @staticmethod
+    def _read_offsets(path):
+        with np.load(f"{path}.offsets.npz") as stored:
+            return stored['offsets'], os.path.join(os.path.dirname(path), str(stored['blob']))
+
+    @classmethod
+    def build(cls, texts, path):
+        """Write ``texts`` (row id ``i`` is position ``i``) to ``path`` and open it."""
+        encoded = [text.encode('utf-8') if isinstance(text, str) else b'' for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        np.cumsum([len(text) for text in encoded], out=offsets[1:])
+
+        directory, name = os.path.dirname(path) or '.', os.path.basename(path)
+        os.makedirs(directory, exist_ok=True)
+        try:
+            previous = cls._read_offsets(path)[1]
+        except (OSError, KeyError, ValueError):
+            previous = None
+        fd, blob = tempfile.mkstemp(prefix=f"{name}.", suffix='.blob', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            f.writelines(encoded)
+        fd, staged = tempfile.mkstemp(prefix=f"{name}.", suffix='.offsets.tmp', dir=directory)
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, offsets=offsets, blob=np.array(os.path.basename(blob)))
+        # The single commit point: the new offsets name the new blob
+        os.replace(staged, f"{path}.offsets.npz")
+        if previous is not None and previous != blob:
+            # Open mappings of the old blob stay valid
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(previous)
+        return cls(path)
+
+    @classmethod
+    def is_fresh(cls, path, source):
+        """Whether the store at ``path`` exists and is newer than ``source``."""
+        try:
+            built = os.path.getmtime(f"{path}.offsets.npz")
+        except OSError:
+            return False
+        return built >= os.path.getmtime(source)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def get(self, row_id):
+        start, end = self.offsets[row_id], self.offsets[row_id + 1]
+        return bytes(self.blob[start:end]).decode('utf-8')
+
+    def get_many(self, row_ids):
+        return [self.get(row_id) for row_id in row_ids]
+
+    def join(self, row_ids, sep=" "):
+        return sep.join(self.get_many(row_ids))
+
+    def contains(self, row_ids, phrase, case=False):
+        """Boolean mask over ``row_ids``, matching like ``Series.str.contains``."""
+        pattern = re.compile(phrase, 0 if case else re.IGNORECASE)
+        return np.fromiter((pattern.search(self.get(row_id)) is not None for row_id in row_ids),
+                           dtype=bool, count=len(row_ids))
+
+    def attach(self, frame, column='Text', after='Profil'):
+        """Copy of ``frame`` with the texts of its rows as ``column``, for display."""
+        frame = frame.copy()
+        position = frame.columns.get_loc(after) + 1 if after in frame.columns else len(frame.columns)
+        frame.insert(position, column, pd.Series(self.get_many(frame.index), index=frame.index, dtype=object))
+        return frame
@@ -0,0 +1,117 @@
+"""Background ingest of new weekly exports with atomic snapshot swaps.
+
+A daemon thread polls the data directory. When a newer export appears (e.g.
+``Jan25-25.02.csv`` after ``Jan25-18.02.csv``) it is loaded off the request path,
+and only once it is fully prepared does ``current_snapshot()`` start returning it.
+Pages take the snapshot once at the top of a rerun, so a rerun in flight keeps
+working on the version it started with.
+"""
+import os
+import re
+import threading
+import time
+import traceback
+from collections import namedtuple
+
+from debrief import anomalies, config, duplicates, rolling, similarity, tags
+from debrief.loader import dataset_name, load_posts
+
+Snapshot = namedtuple('Snapshot', ['version', 'path', 'data', 'post_texts'])
+
+# Files touched more recently than this may still be being copied in
+SETTLE_SECONDS = 2
+
+
+def export_sort_key(path):
+    match = re.match(config.EXPORT_PATTERN, os.path.basename(path))
+    year, day, month = (int(part) for part in match.groups())
+    return year, month, day, os.path.getmtime(path)
+
+
+def latest_export(data_dir=None):
+    """Path of the newest export in ``data_dir``, by the date in its name."""
+    data_dir = data_dir or config.DATA_DIR
+    exports = [os.path.join(data_dir, name) for name in os.listdir(data_dir)
+               if re.match(config.EXPORT_PATTERN, name)]
+    return max(exports, key=export_sort_key) if exports else None
+
+
+def snapshot_version(path):
+    return f"{dataset_name(path)}@{os.path.getmtime(path):.0f}"
+
+
+class SnapshotWatcher:
+    def __init__(self, data_dir=None, interval=None):
+        self.data_dir = data_dir or config.DATA_DIR
+        self.interval = interval or config.WATCH_INTERVAL
+        self._current = None
+        self._ingest_hooks = []
+        self._thread = None
+
+    def current(self):
+        return self._current
+
+    def add_ingest_hook(self, hook):
+        """Call ``hook(snapshot)`` for each new snapshot, before it is swapped in."""
+        self._ingest_hooks.append(hook)
+
+    def start(self):
+        # The very first snapshot is loaded in the foreground; there is nothing to serve yet
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name='snapshot-watcher', daemon=True)
+        self._thread.start()
+        return self
+
+    def poll(self):
+        """Ingest the newest export if it differs from the current snapshot."""
+        path = latest_export(self.data_dir)
+        if path is None:
+            return False
+        if self._current is not None and time.time() - os.path.getmtime(path) < SETTLE_SECONDS:
+            return False
+        version = snapshot_version(path)
+        if self._current is not None and self._current.version == version:
+            return False
+
+        data, post_texts = load_posts(path)
+        snapshot = Snapshot(version, path, data, post_texts)
+        for hook in self._ingest_hooks:
+            hook(snapshot)
+        # A single reference assignment, so readers see the old or the new snapshot whole
+        self._current = snapshot
+        return True
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll()
+            except Exception:
+                # Keep serving the previous snapshot; the next poll retries
+                traceback.print_exc()
+
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+def get_watcher():
+    """The process-wide watcher, started on first use."""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            watcher = SnapshotWatcher()
+            # Indexes derived from the posts are built before a snapshot is served
+            watcher.add_ingest_hook(tags.index_snapshot)
+            watcher.add_ingest_hook(duplicates.index_snapshot)
+            watcher.add_ingest_hook(rolling.index_snapshot)
+            watcher.add_ingest_hook(similarity.index_snapshot)
+            # Flags posts and profiles that deviate from their running statistics
+            watcher.add_ingest_hook(anomalies.index_snapshot)
+            # Only a started watcher is kept; if the first poll raises, the next page run tries again
+            _watcher = watcher.start()
+    return _watcher
+
+
+def current_snapshot():
+    return get_watcher().current()
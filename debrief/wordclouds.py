@@ -0,0 +1,92 @@
+"""Word-cloud rendering fanned out over process pools.
+
+The pages share one pool; the prefetch worker renders in its own, so that a
+timeout in either, which discards the pool, does not cancel the other's renders.
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from debrief import config
+
+# name -> (pool, max_workers)
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def render_wordcloud(text):
+    # Runs in a worker process; only the RGB array travels back to the page, which
+    # therefore never imports wordcloud (and matplotlib with it) itself
+    from wordcloud import WordCloud
+
+    return WordCloud(width=800, height=400, background_color='white').generate(text).to_array()
+
+
+def _get_pool(name, max_workers):
+    with _pools_lock:
+        pool, workers = _pools.get(name, (None, None))
+        if pool is None or workers != max_workers:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            pool = ProcessPoolExecutor(max_workers=max_workers)
+            _pools[name] = (pool, max_workers)
+        return pool
+
+
+def _discard_pool(name, pool):
+    with _pools_lock:
+        # Another thread may have replaced it already; a fresh pool is kept
+        if _pools.get(name, (None,))[0] is not pool:
+            return
+        del _pools[name]
+    # Shutting down does not stop a render that is running; its process is stopped, or it keeps a core busy
+    processes = list((getattr(pool, '_processes', None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        process.join(1)
+
+
+def iter_wordclouds(texts, max_workers=None, timeout=None, pool='pages'):
+    """Yield ``(label, image)`` pairs for ``texts`` in completion order.
+
+    ``texts`` maps each category label to the joined text of its posts. A label whose
+    cloud fails, or does not finish within ``timeout`` seconds, is yielded with ``None``.
+    ``pool`` names the process pool to render in.
+    """
+    max_workers = max_workers or config.WORDCLOUD_WORKERS
+    timeout = timeout or config.WORDCLOUD_TIMEOUT
+    executor = _get_pool(pool, max_workers)
+
+    started = time.monotonic()
+    futures = {}
+    for i, (label, text) in enumerate(texts.items()):
+        # Tasks beyond the first max_workers queue up, so each wave gets its own time slot
+        deadline = started + timeout * (i // max_workers + 1)
+        futures[executor.submit(render_wordcloud, text)] = (label, deadline)
+
+    pending = set(futures)
+    timed_out = False
+    while pending:
+        next_deadline = min(futures[future][1] for future in pending)
+        done, pending = wait(pending, timeout=max(0, next_deadline - time.monotonic()),
+                             return_when=FIRST_COMPLETED)
+        for future in done:
+            label = futures[future][0]
+            try:
+                yield label, future.result()
+            except Exception:
+                yield label, None
+
+        now = time.monotonic()
+        expired = {future for future in pending if futures[future][1] <= now}
+        pending -= expired
+        for future in expired:
+            timed_out = True
+            future.cancel()
+            yield futures[future][0], None
+
+    if timed_out:
+        # A stuck render keeps its worker busy, so the next rerun starts with a fresh pool
+        _discard_pool(pool, executor)
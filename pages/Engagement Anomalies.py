@@ -0,0 +1,106 @@
+import streamlit as st
+import pandas as pd
+from debrief import anomalies, config
+from debrief.compact import expand_posts
+from debrief.dataflow import session_flow
+from debrief.watcher import current_snapshot
+
+st.set_page_config(layout="wide")
+
+# Every new export is scored against each profile's running statistics while it is ingested
+snapshot = current_snapshot()
+if snapshot is None:
+    st.error("No export found in pages/data.")
+    st.stop()
+
+flow = session_flow('Engagement Anomalies')
+flow.source('snapshot', snapshot, key=snapshot.version)
+
+# Streamlit app title
+st.title('Engagement Anomalies')
+st.caption(f"Export: {snapshot.path}")
+st.markdown(
+    f"""
+    Für jedes Profil wird ein gleitender Mittelwert (EWMA) von Likes, Kommentaren und Interaktionsrate (logarithmiert)
+    mitgeführt. Neue Posts, die mindestens {config.ANOMALY_THRESHOLD:g} Standardabweichungen davon abweichen, werden
+    markiert, sobald das Profil {config.ANOMALY_MIN_HISTORY} Posts hat. Profile werden markiert, wenn ihre neuen Posts
+    eines Exports gemeinsam deutlich abweichen.
+    """
+)
+
+# Flags only change when an export is ingested
+@flow.node('snapshot')
+def flags(snapshot):
+    return anomalies.read_flags()
+
+flags = flow.get('flags')
+if flags.empty:
+    st.info("No anomalies flagged yet.")
+    st.stop()
+
+# Sidebar for filtering options
+st.sidebar.title("Filter Options")
+
+# Newest export first
+exports = list(dict.fromkeys(flags['snapshot']))[::-1]
+export = st.sidebar.selectbox("Export", options=exports,
+                              index=exports.index(snapshot.version) if snapshot.version in exports else 0)
+
+metrics_list = st.sidebar.multiselect("Select Metrics", options=['All'] + anomalies.METRICS, default=['All'])
+selected_metrics = anomalies.METRICS if 'All' in metrics_list else metrics_list
+
+direction = st.sidebar.selectbox("Direction", options=['Above expectation', 'Below expectation', 'Both'])
+min_score = st.sidebar.slider("Minimum deviation (standard deviations)",
+                              min_value=float(config.ANOMALY_THRESHOLD), max_value=20.0,
+                              value=float(config.ANOMALY_THRESHOLD), step=0.5)
+
+flow.source('selection', (export, selected_metrics, direction, min_score))
+
+@flow.node('flags', 'selection')
+def selected_flags(flags, selection):
+    export, metrics, direction, min_score = selection
+    selected = flags[(flags['snapshot'] == export) & flags['metric'].isin(metrics)]
+    score = {'Above expectation': selected['score'], 'Below expectation': -selected['score'],
+             'Both': selected['score'].abs()}[direction]
+    return selected[score >= min_score].sort_values('score', key=abs, ascending=False)
+
+# Flagged posts with their text and link, where the served export still has them
+@flow.node('snapshot', 'selected_flags')
+def flagged_posts(snapshot, selected_flags):
+    posts = selected_flags[selected_flags['kind'] == 'post']
+    data = snapshot.data
+    row_ids = pd.Series(data.index, index=data['Beitrag-ID'].astype(str))
+    row_ids = row_ids[~row_ids.index.duplicated()]
+    found = row_ids.reindex(posts['Beitrag-ID']).to_numpy()
+    present = pd.notna(found)
+    table = posts[['Datum', 'Profil', 'Beitrag-ID', 'metric', 'value', 'expected', 'score']].reset_index(drop=True)
+    details = snapshot.post_texts.attach(expand_posts(data.loc[found[present].astype(int)]))
+    table.loc[present, 'Link'] = details['Link'].to_numpy()
+    table.loc[present, 'Text'] = details['Text'].to_numpy()
+    return table
+
+selected_flags = flow.get('selected_flags')
+profile_flags = selected_flags[selected_flags['kind'] == 'profile']
+post_flags = flow.get('flagged_posts')
+
+col1, col2 = st.columns(2)
+col1.metric("Flagged posts", post_flags['Beitrag-ID'].nunique())
+col2.metric("Flagged profiles", profile_flags['Profil'].nunique())
+
+st.write("## Profiles")
+if not profile_flags.empty:
+    st.dataframe(profile_flags[['Profil', 'metric', 'score', 'posts']], hide_index=True, use_container_width=True,
+                 column_config={'score': st.column_config.NumberColumn('Deviation', format='%.1f'),
+                                'posts': st.column_config.NumberColumn('New posts')})
+else:
+    st.write("No profiles flagged for this selection.")
+
+st.write("## Posts")
+if not post_flags.empty:
+    st.dataframe(post_flags, hide_index=True, use_container_width=True,
+                 column_config={'value': st.column_config.NumberColumn('Value', format='%.4g'),
+                                'expected': st.column_config.NumberColumn('Expected', format='%.4g'),
+                                'score': st.column_config.NumberColumn('Deviation', format='%.1f'),
+                                'Link': st.column_config.LinkColumn('Link')})
+else:
+    st.write("No posts flagged for this selection.")
@@ -1,5 +1,85 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+from debrief.google_ads import DAILY_METRICS, ensure_store, partitions, read_daily, read_rows, source_version
 
-# Load the new CSV file
+st.set_page_config(layout="wide")
+
+# Rebuild the partitioned store whenever one of the exports changes
+@st.cache_resource(max_entries=1)
+def load_store(version):
+    return ensure_store()
+
+# Pre-aggregated daily metrics, read from the selected partitions only
+@st.cache_data(max_entries=32)
+def load_daily(store_version, campaign_types, years):
+    return read_daily(campaign_types, years)
+
+store_version = load_store(source_version())
+
+st.title('Google and YouTube Ads')
+
+available = partitions()
+if not available:
+    st.info("No Google Ads exports found. Place search_all.csv, video_all.csv and/or display_all.csv "
+            "from processing.ipynb in pages/data.")
+    st.stop()
+
+# Sidebar filters, taken from the partition directories without reading any data
+st.sidebar.title("Filter Options")
+
+campaign_types = sorted({campaign_type for campaign_type, _ in available})
+types_list = st.sidebar.multiselect("Select Campaign Types", options=['All'] + campaign_types, default=['All'])
+selected_types = campaign_types if 'All' in types_list else types_list
+
+years = sorted({year for campaign_type, year in available if campaign_type in selected_types})
+years_list = st.sidebar.multiselect("Select Years", options=['All'] + years, default=['All'])
+selected_years = years if 'All' in years_list else years_list
+
+daily = load_daily(store_version, tuple(selected_types), tuple(selected_years))
+
+campaigns = daily['Campaign'].dropna().unique()
+campaigns_list = st.sidebar.multiselect("Select Campaigns", options=['All'] + list(campaigns), default=['All'])
+if 'All' not in campaigns_list:
+    daily = daily[daily['Campaign'].isin(campaigns_list)]
+
+if daily.empty:
+    st.info("No data for the selected filters.")
+    st.stop()
+
+# KPIs
+total_cost = daily['Cost'].sum()
+total_clicks = daily['Clicks'].sum()
+total_impressions = daily['Impr.'].sum()
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Spend (EUR)", f"{total_cost:,.2f}")
+col2.metric("Clicks", f"{total_clicks:,.0f}")
+col3.metric("Impressions", f"{total_impressions:,.0f}")
+col4.metric("CTR", f"{total_clicks / total_impressions:.2%}" if total_impressions else "-")
+
+# Daily totals per campaign type
+per_day = daily.groupby(['Day', 'campaign_type'])[DAILY_METRICS].sum().unstack('campaign_type')
+
+st.write("### Daily Spend (EUR)")
+st.line_chart(per_day['Cost'])
+
+col5, col6 = st.columns(2)
+with col5:
+    st.write("### Daily Clicks")
+    st.line_chart(per_day['Clicks'])
+with col6:
+    st.write("### Daily Impressions")
+    st.line_chart(per_day['Impr.'])
+
+st.write("### Campaign Overview")
+campaign_totals = daily.groupby(['campaign_type', 'year', 'Campaign'])[DAILY_METRICS].sum()
+campaign_totals['CTR'] = campaign_totals['Clicks'] / campaign_totals['Impr.']
+st.dataframe(campaign_totals)
+
+# The full export rows are only read when asked for
+if st.checkbox("Show export rows"):
+    for campaign_type in selected_types:
+        rows = read_rows(campaign_type, selected_years)
+        if 'All' not in campaigns_list:
+            rows = rows[rows['Campaign'].isin(campaigns_list)]
+        st.write(f"#### {campaign_type.capitalize()} campaigns")
+        st.dataframe(rows)
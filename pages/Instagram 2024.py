@@ -1,7 +1,6 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from debrief.wordclouds import iter_wordclouds
 
 st.set_page_config(layout="wide")
 
@@ -189,36 +188,11 @@ wordcloud_option = st.sidebar.selectbox("Select Word Cloud Type", options=['sent
 # Word Cloud for Text Analysis
 st.write("### Word Cloud for Text Analysis by Selected Type")
 
-# Generate and display word clouds based on the selected option
-if wordcloud_option == 'sentiment':
-    for sentiment in filtered_data['sentiment'].unique():
-        sentiment_text = " ".join(filtered_data[filtered_data['sentiment'] == sentiment]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(sentiment_text)
-        
-        st.write(f"#### Word Cloud for {sentiment} Sentiment")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-        
-elif wordcloud_option == 'emotion':
-    for emotion in filtered_data['emotion'].unique():
-        emotion_text = " ".join(filtered_data[filtered_data['emotion'] == emotion]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(emotion_text)
-        
-        st.write(f"#### Word Cloud for {emotion} Emotion")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-        
-elif wordcloud_option == 'politikfeld':
-    for politikfeld in filtered_data['politikfeld'].unique():
-        politikfeld_text = " ".join(filtered_data[filtered_data['politikfeld'] == politikfeld]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(politikfeld_text)
-        
-        st.write(f"#### Word Cloud for {politikfeld} Politikfeld")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
+# Generate the word clouds in parallel and show each one as soon as it is ready
+texts = filtered_data.groupby(wordcloud_option, sort=False)['Text'].apply(" ".join).to_dict()
+for label, image in iter_wordclouds(texts):
+    st.write(f"#### Word Cloud for {label} {wordcloud_option.capitalize()}")
+    if image is not None:
+        st.image(image, use_column_width=True)
+    else:
+        st.warning(f"The word cloud for {label} could not be generated.")
@@ -1,31 +1,27 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
-from wordcloud import WordCloud
-import matplotlib.pyplot as plt
+from debrief import config, prefetch
+from debrief.compact import expand_posts
+from debrief.dataflow import session_flow
+from debrief.query import post_query
+from debrief.rolling import WINDOWS, RollingMetrics, rolling_metrics
+from debrief.watcher import current_snapshot
+from debrief.wordclouds import iter_wordclouds
 
 st.set_page_config(layout="wide")
 
 # --- Load and Preprocess Data ---
-data = pd.read_csv("pages/data/Jan25-18.02.csv")
-
-# Normalize columns by stripping extra quotes and whitespace
-data['sentiment'] = data['sentiment'].str.strip(" '")
-data['politikfeld'] = data['politikfeld'].str.strip(" '")
-data['emotion'] = data['emotion'].str.strip(" '")
-data.columns = data.columns.str.strip()
-
-# Convert columns to numeric (removing commas)
-data['Anzahl Likes'] = data['Anzahl Likes'].str.replace(',', '').astype(float)
-data['Anzahl Kommentare'] = data['Anzahl Kommentare'].str.replace(',', '').astype(float)
-data['Reaktionen, Kommentare & Shares'] = data['Reaktionen, Kommentare & Shares'].str.replace(',', '').astype(float)
-data['Post-Interaktionsrate'] = data['Post-Interaktionsrate'].str.replace(',', '.').astype(float)
-
-# Convert 'Datum' to datetime (replace commas with space)
-data['Datum'] = data['Datum'].str.replace(',', ' ')
-data['Datum'] = pd.to_datetime(data['Datum'], format='%d.%m.%y %H:%M', errors='coerce')
+# Newest export, ingested in the background; post bodies stay in the memory-mapped text store
+snapshot = current_snapshot()
+if snapshot is None:
+    st.error("No export found in pages/data.")
+    st.stop()
+data, post_texts = snapshot.data, snapshot.post_texts
+
+# Derived data and figures are nodes memoised on their inputs, so a widget change
+# only rebuilds what depends on it
+flow = session_flow('Instagram 2025 - Bessere Visualisierungen')
+flow.source('snapshot', snapshot, key=snapshot.version)
 
 # --- Sidebar Filters ---
 st.sidebar.title("Filter Options")
@@ -33,98 +29,117 @@ st.sidebar.title("Filter Options")
 # Group filter
 groups = data['Gruppe'].unique()
 groups_list = st.sidebar.multiselect("Select Group", options=['All'] + list(groups), default=['All'])
-selected_groups = groups if 'All' in groups_list else groups_list
 
 # Profile filter
 profiles = data['Profil'].unique()
 profiles_list = st.sidebar.multiselect("Select Profiles", options=['All'] + list(profiles), default=['All'])
-selected_profiles = profiles if 'All' in profiles_list else profiles_list
 
 # Sentiment filter
 sentiments = data['sentiment'].unique()
 sentiments_list = st.sidebar.multiselect("Select Sentiments", options=['All'] + list(sentiments), default=['All'])
-selected_sentiments = sentiments if 'All' in sentiments_list else sentiments_list
 
 # Politikfeld filter
 politikfelds = data['politikfeld'].unique()
 politikfeld_list = st.sidebar.multiselect("Select Politikfeld", options=['All'] + list(politikfelds), default=['All'])
-selected_politikfeld = politikfelds if 'All' in politikfeld_list else politikfeld_list
 
 # Emotion filter
 emotions = data['emotion'].unique()
 emotions_list = st.sidebar.multiselect("Select Emotions", options=['All'] + list(emotions), default=['All'])
-selected_emotions = emotions if 'All' in emotions_list else emotions_list
 
 # Text search filter
 phrase = st.sidebar.text_input("Enter a phrase to search in Text", value="")
 
-# Filter the data based on selections
-filtered_data = data[
-    (data['Profil'].isin(selected_profiles)) &
-    (data['sentiment'].isin(selected_sentiments)) &
-    (data['politikfeld'].isin(selected_politikfeld)) &
-    (data['emotion'].isin(selected_emotions)) &
-    (data['Gruppe'].isin(selected_groups))
-]
-
-if phrase:
-    filtered_data = filtered_data[filtered_data['Text'].str.contains(phrase, case=False, na=False)]
+# Filter the data based on selections (columns left at 'All' are not filtered)
+filters = {
+    column: selection
+    for column, selection in [('Profil', profiles_list), ('sentiment', sentiments_list),
+                              ('politikfeld', politikfeld_list), ('emotion', emotions_list),
+                              ('Gruppe', groups_list)]
+    if 'All' not in selection
+}
+flow.source('filters', filters)
+flow.source('phrase', phrase)
+# Counted towards the filter states the prefetcher warms ahead
+prefetch.observe(filters)
+
+@flow.node('snapshot', 'filters', 'phrase')
+def posts(snapshot, filters, phrase):
+    return post_query(snapshot, filters, phrase)
+
+# Shared by all sessions, and often computed ahead by the prefetcher
+@flow.node('snapshot', 'filters', 'phrase')
+def filtered_data(snapshot, filters, phrase):
+    return prefetch.filtered_data(snapshot, filters, phrase)
+
+# Categories with enough posts, ranked by the lower bound of the bootstrap interval of their mean
+@flow.node('snapshot', 'filters', 'phrase')
+def performance(snapshot, filters, phrase):
+    return prefetch.performance(snapshot, filters, phrase)
+
+filtered_data = flow.get('filtered_data')
 
 st.markdown("WORK IN PROGRESS - Hier teste ich neue Visualisierungen/Plots/Wordclouds/Maps mit Plotly, anstelle der weniger leistungsstarken streamlit lösung auf der Instagram 2025 Seite. Wenn ich hier fertig bin, wird plotly auch auf der Hauptseite eingebunden.")
 
 # --- Performance Metrics (existing logic) ---
+# Shown as 'N/A' (without top posts) when no category has enough posts
+best_sentiment = best_emotion = best_politikfeld = "N/A"
 if 'Post-Interaktionsrate' in filtered_data.columns:
-    filtered_data['Post-Interaktionsrate'] = pd.to_numeric(filtered_data['Post-Interaktionsrate'], errors='coerce')
-    sentiment_perf = filtered_data.groupby('sentiment')['Post-Interaktionsrate'].mean()
-    emotion_perf = filtered_data.groupby('emotion')['Post-Interaktionsrate'].mean()
-    politikfeld_perf = filtered_data.groupby('politikfeld')['Post-Interaktionsrate'].mean()
+    performance = flow.get('performance')
+    sentiment_perf = performance['sentiment']
+    emotion_perf = performance['emotion']
+    politikfeld_perf = performance['politikfeld']
 
     if not sentiment_perf.empty and not emotion_perf.empty and not politikfeld_perf.empty:
         try:
-            best_sentiment = sentiment_perf.idxmax()
-            best_sentiment_rate = sentiment_perf.loc[best_sentiment]
+            best_sentiment = sentiment_perf['lower'].idxmax()
+            best_sentiment_rate = sentiment_perf.loc[best_sentiment, 'mean']
+            best_sentiment_lower = sentiment_perf.loc[best_sentiment, 'lower']
         except Exception as e:
             best_sentiment = "N/A"
-            best_sentiment_rate = 0
+            best_sentiment_rate = best_sentiment_lower = 0
             st.error(f"Error determining best sentiment: {e}")
         try:
-            best_emotion = emotion_perf.idxmax()
-            best_emotion_rate = emotion_perf.loc[best_emotion]
+            best_emotion = emotion_perf['lower'].idxmax()
+            best_emotion_rate = emotion_perf.loc[best_emotion, 'mean']
+            best_emotion_lower = emotion_perf.loc[best_emotion, 'lower']
         except Exception as e:
             best_emotion = "N/A"
-            best_emotion_rate = 0
+            best_emotion_rate = best_emotion_lower = 0
             st.error(f"Error determining best emotion: {e}")
         try:
-            best_politikfeld = politikfeld_perf.idxmax()
-            best_politikfeld_rate = politikfeld_perf.loc[best_politikfeld]
+            best_politikfeld = politikfeld_perf['lower'].idxmax()
+            best_politikfeld_rate = politikfeld_perf.loc[best_politikfeld, 'mean']
+            best_politikfeld_lower = politikfeld_perf.loc[best_politikfeld, 'lower']
         except Exception as e:
             best_politikfeld = "N/A"
-            best_politikfeld_rate = 0
+            best_politikfeld_rate = best_politikfeld_lower = 0
             st.error(f"Error determining best politikfeld: {e}")
 
         st.markdown(
             f"""
             ### Zusammenfassung:
-            - **Sentiment:** {best_sentiment} (Avg. Interaction Rate: {best_sentiment_rate:.2f})
-            - **Emotion:** {best_emotion} (Avg. Interaction Rate: {best_emotion_rate:.2f})
-            - **Politikfeld:** {best_politikfeld} (Avg. Interaction Rate: {best_politikfeld_rate:.2f})
+            - **Sentiment:** {best_sentiment} (Avg. Interaction Rate: {best_sentiment_rate:.2f}, untere 95%-Grenze: {best_sentiment_lower:.2f})
+            - **Emotion:** {best_emotion} (Avg. Interaction Rate: {best_emotion_rate:.2f}, untere 95%-Grenze: {best_emotion_lower:.2f})
+            - **Politikfeld:** {best_politikfeld} (Avg. Interaction Rate: {best_politikfeld_rate:.2f}, untere 95%-Grenze: {best_politikfeld_lower:.2f})
             """
         )
     else:
-        st.info("Not enough data to compute performance metrics for one or more categories.")
+        st.info(f"Not enough data to compute performance metrics for one or more categories "
+                f"(at least {config.MIN_SUPPORT} posts per category are needed).")
 else:
     st.info("The 'Post-Interaktionsrate' column is not available to calculate performance metrics.")
 
 # --- Top Posts Display (existing logic) ---
-if 'Post-Interaktionsrate' in filtered_data.columns:
-    filtered_data['Post-Interaktionsrate'] = pd.to_numeric(filtered_data['Post-Interaktionsrate'], errors='coerce')
+flow.source('best', {'sentiment': best_sentiment, 'emotion': best_emotion, 'politikfeld': best_politikfeld})
+
+@flow.node('posts', 'best')
+def top_posts(posts, best):
+    return {dimension: posts.top(dimension, value) for dimension, value in best.items()}
 
-top_sentiment_posts = filtered_data[filtered_data['sentiment'] == best_sentiment] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
-top_emotion_posts = filtered_data[filtered_data['emotion'] == best_emotion] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
-top_politikfeld_posts = filtered_data[filtered_data['politikfeld'] == best_politikfeld] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
+top_posts = flow.get('top_posts')
+top_sentiment_posts = top_posts['sentiment']
+top_emotion_posts = top_posts['emotion']
+top_politikfeld_posts = top_posts['politikfeld']
 
 cols = st.columns(3)
 with cols[0]:
@@ -133,7 +148,7 @@ with cols[0]:
         for _, row in top_sentiment_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this sentiment.")
@@ -144,7 +159,7 @@ with cols[1]:
         for _, row in top_emotion_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this emotion.")
@@ -155,7 +170,7 @@ with cols[2]:
         for _, row in top_politikfeld_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this politikfeld.")
@@ -163,169 +178,169 @@ with cols[2]:
 st.write("Number of rows after filtering:", len(filtered_data))
 if filtered_data['Datum'].isna().sum() > 0:
     st.write("Warning: Some 'Datum' values could not be parsed. They are excluded from plots.")
-    filtered_data = filtered_data.dropna(subset=['Datum'])
+
+# Everything below only uses the posts with a parseable Datum
+@flow.node('filtered_data')
+def dated_data(filtered_data):
+    dated_data = filtered_data.dropna(subset=['Datum'])
+    # Convert Datum to datetime (if not already) and create a 'Date' column for daily aggregation
+    return dated_data.assign(Datum=pd.to_datetime(dated_data['Datum']), Date=dated_data['Datum'].dt.date)
 
 # --- Create Aggregated Daily Data for Plotly Charts ---
-# Convert Datum to datetime (if not already) and create a 'Date' column for daily aggregation
-filtered_data['Datum'] = pd.to_datetime(filtered_data['Datum'])
-daily_data = filtered_data.copy()
-daily_data['Date'] = daily_data['Datum'].dt.date
-
-# Aggregate daily metrics (using the mean for demonstration)
-daily_data = daily_data.groupby('Date').agg({
-    'Anzahl Likes': 'mean',
-    'Anzahl Kommentare': 'mean',
-    'Reaktionen, Kommentare & Shares': 'mean',
-    'Post-Interaktionsrate': 'mean'
-}).reset_index()
-
-# Optional: Create a rolling average for smoothing (e.g., 7-day window)
-daily_data['Likes_Rolling'] = daily_data['Anzahl Likes'].rolling(window=7).mean()
+@flow.node('dated_data')
+def daily_data(dated_data):
+    # Aggregate daily metrics (using the mean for demonstration)
+    daily_data = dated_data.groupby('Date').agg({
+        'Anzahl Likes': 'mean',
+        'Anzahl Kommentare': 'mean',
+        'Reaktionen, Kommentare & Shares': 'mean',
+        'Post-Interaktionsrate': 'mean'
+    }).reset_index()
+    return daily_data
+
+# --- Rolling Trends per Gruppe or Profil ---
+st.sidebar.title("Trend Options")
+trend_group = st.sidebar.selectbox("Trends per", options=['Gruppe', 'Profil'])
+trend_window = st.sidebar.selectbox("Rolling window (days)", options=[1, *WINDOWS], index=2)
+flow.source('trend_group', trend_group)
+
+# Post-weighted trailing-window means; the engines of the unfiltered data are kept
+# up to date by the watcher, a filtered selection gets its own
+@flow.node('snapshot', 'filters', 'phrase', 'dated_data', 'trend_group')
+def rolling_data(snapshot, filters, phrase, dated_data, trend_group):
+    if not filters and not phrase:
+        return rolling_metrics(snapshot, trend_group)
+    return RollingMetrics.from_posts(dated_data, trend_group)
+
+filtered_data = flow.get('dated_data')
+daily_data = flow.get('daily_data')
 
 # --- Plotly Visualizations ---
+# Plotly is only imported once the summary and top posts above are on screen. The
+# serialised figures are cached per filter state and export for all sessions, so
+# unchanged charts are neither rebuilt nor reserialised
+from debrief import charts
+
+chart_key = (charts.filter_hash(filters, phrase), snapshot.version)
+
 st.write("## Visualizations with Plotly")
 
-# 1. Daily Average Likes Over Time (Line Chart without markers)
 if not daily_data.empty:
-    fig_likes = px.line(
-        daily_data,
+    # 1. Daily Average Likes Over Time (Line Chart without markers)
+    charts.plotly_chart('likes', chart_key, lambda: charts.line(
+        flow.get('daily_data'),
         x='Date',
         y='Anzahl Likes',
         title='Daily Average Likes Over Time',
         labels={'Date': 'Date', 'Anzahl Likes': 'Average Likes'}
-    )
-    st.plotly_chart(fig_likes, use_container_width=True)
+    ))
 
-# 2. Daily Average Comments Over Time (Line Chart)
-if not daily_data.empty:
-    fig_comments = px.line(
-        daily_data,
+    # 2. Daily Average Comments Over Time (Line Chart)
+    charts.plotly_chart('comments', chart_key, lambda: charts.line(
+        flow.get('daily_data'),
         x='Date',
         y='Anzahl Kommentare',
         title='Daily Average Comments Over Time',
         labels={'Date': 'Date', 'Anzahl Kommentare': 'Average Comments'}
-    )
-    st.plotly_chart(fig_comments, use_container_width=True)
+    ))
 
-# 3. Dual-Axis Chart for Daily Average Likes and Comments
-if not daily_data.empty:
-    fig_dual = make_subplots(specs=[[{"secondary_y": True}]])
-    fig_dual.add_trace(
-        go.Scatter(
-            x=daily_data['Date'],
-            y=daily_data['Anzahl Likes'],
-            name="Likes",
-            mode="lines",
-            line=dict(color='blue', width=2),
-            opacity=0.8
-        ),
-        secondary_y=False
-    )
-    fig_dual.add_trace(
-        go.Scatter(
-            x=daily_data['Date'],
-            y=daily_data['Anzahl Kommentare'],
-            name="Comments",
-            mode="lines",
-            line=dict(color='red', width=2),
-            opacity=0.8
-        ),
-        secondary_y=True
-    )
-    fig_dual.update_layout(
-        title_text="Daily Average Likes and Comments Over Time",
-        xaxis_title="Date",
-        legend=dict(orientation="h", x=0, y=-0.2)
-    )
-    fig_dual.update_yaxes(title_text="Average Likes", secondary_y=False)
-    fig_dual.update_yaxes(title_text="Average Comments", secondary_y=True)
-    st.plotly_chart(fig_dual, use_container_width=True)
-
-# 4. Rolling Average of Likes (7-Day Rolling Average)
-if not daily_data.empty:
-    fig_roll = px.line(
-        daily_data,
+    # 3. Dual-Axis Chart for Daily Average Likes and Comments
+    charts.plotly_chart('likes_comments', chart_key, lambda: charts.dual_axis(
+        flow.get('daily_data'),
         x='Date',
-        y='Likes_Rolling',
-        title='7-Day Rolling Average of Likes',
-        labels={'Date': 'Date', 'Likes_Rolling': '7-Day Avg Likes'}
-    )
-    st.plotly_chart(fig_roll, use_container_width=True)
+        left=('Anzahl Likes', "Likes", 'blue', "Average Likes"),
+        right=('Anzahl Kommentare', "Comments", 'red', "Average Comments"),
+        title="Daily Average Likes and Comments Over Time",
+        x_title="Date"
+    ))
+
+    # 4. Rolling Average of Likes per Post over 3, 7 and 14 days
+    charts.plotly_chart('likes_rolling', chart_key, lambda: charts.line(
+        flow.get('rolling_data').frame(WINDOWS, total=True),
+        x='Date',
+        y='Anzahl Likes',
+        color='window',
+        title='Rolling Average of Likes per Post',
+        labels={'Date': 'Date', 'Anzahl Likes': 'Avg Likes per Post', 'window': 'Window'}
+    ))
 
-# 5. Likes Over Time by Gruppe (Aggregated by Date)
+# 5. Rolling Average of Likes per Post by Gruppe or Profil
 if not filtered_data.empty:
-    # Create a copy and ensure 'Datum' is datetime
-    group_data = filtered_data.copy()
-    group_data['Datum'] = pd.to_datetime(group_data['Datum'])
-    
-    # Create a new column for just the date (without time)
-    group_data['Date'] = group_data['Datum'].dt.date
-    
-    # Aggregate the likes by Date and Gruppe. 
-    # You can choose 'mean', 'sum', or another aggregation based on your needs.
-    group_data_agg = group_data.groupby(['Date', 'Gruppe'], as_index=False)['Anzahl Likes'].mean()
-    
-    # Plot the aggregated data with Plotly Express
-    fig_group = px.line(
-        group_data_agg,
+    charts.plotly_chart('likes_by_group', (*chart_key, trend_group, trend_window), lambda: charts.line(
+        flow.get('rolling_data').frame([trend_window]),
         x='Date',
         y='Anzahl Likes',
-        color='Gruppe',
-        title='Daily Average Likes Over Time by Gruppe',
-        labels={'Date': 'Date', 'Anzahl Likes': 'Average Likes'}
-    )
-    st.plotly_chart(fig_group, use_container_width=True)
+        color=trend_group,
+        title=f'{trend_window}-Day Rolling Average of Likes per Post by {trend_group}',
+        labels={'Date': 'Date', 'Anzahl Likes': 'Avg Likes per Post'}
+    ))
 
 
 # 6. Sentiment Distribution (Bar Chart)
-if 'sentiment' in filtered_data.columns:
-    sentiment_counts = filtered_data['sentiment'].value_counts().reset_index()
+@flow.node('dated_data')
+def sentiment_counts(dated_data):
+    sentiment_counts = dated_data['sentiment'].value_counts().loc[lambda counts: counts > 0].reset_index()
     sentiment_counts.columns = ['sentiment', 'count']
-    fig_sentiment = px.bar(
-        sentiment_counts,
+    return sentiment_counts
+
+if 'sentiment' in filtered_data.columns:
+    charts.plotly_chart('sentiment', chart_key, lambda: charts.bar(
+        flow.get('sentiment_counts'),
         x='sentiment',
         y='count',
         title="Sentiment Distribution",
         labels={'sentiment': 'Sentiment', 'count': 'Number of Posts'},
         color='sentiment'
-    )
-    st.plotly_chart(fig_sentiment, use_container_width=True)
+    ))
 
 # --- Word Cloud Section (existing logic) ---
 st.sidebar.title("Word Cloud Options")
 wordcloud_option = st.sidebar.selectbox("Select Word Cloud Type", options=['sentiment', 'emotion', 'politikfeld'])
+flow.source('wordcloud_option', wordcloud_option)
 
 st.write("### Word Cloud for Text Analysis by Selected Type")
-if wordcloud_option == 'sentiment':
-    for sentiment in filtered_data['sentiment'].unique():
-        sentiment_text = " ".join(filtered_data[filtered_data['sentiment'] == sentiment]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(sentiment_text)
-        st.write(f"#### Word Cloud for {sentiment} Sentiment")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-elif wordcloud_option == 'emotion':
-    for emotion in filtered_data['emotion'].unique():
-        emotion_text = " ".join(filtered_data[filtered_data['emotion'] == emotion]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(emotion_text)
-        st.write(f"#### Word Cloud for {emotion} Emotion")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-elif wordcloud_option == 'politikfeld':
-    for politikfeld in filtered_data['politikfeld'].unique():
-        politikfeld_text = " ".join(filtered_data[filtered_data['politikfeld'] == politikfeld]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(politikfeld_text)
-        st.write(f"#### Word Cloud for {politikfeld} Politikfeld")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
+
+@flow.node('snapshot', 'dated_data', 'wordcloud_option')
+def cloud_texts(snapshot, dated_data, wordcloud_option):
+    return prefetch.cloud_texts(snapshot, dated_data, wordcloud_option)
+
+cloud_texts = flow.get('cloud_texts')
+# Shared by all sessions: each run shows the ones finished so far, also by other sessions
+cloud_images = prefetch.cloud_images(snapshot, filters, phrase, False, wordcloud_option)
+
+def show_wordcloud(label, image):
+    st.write(f"#### Word Cloud for {label} {wordcloud_option.capitalize()}")
+    if image is not None:
+        st.image(image, use_column_width=True)
+    else:
+        st.warning(f"The word cloud for {label} could not be generated.")
+
+for label, image in cloud_images.items():
+    show_wordcloud(label, image)
+missing = {label: text for label, text in cloud_texts.items() if label not in cloud_images}
+for label, image in iter_wordclouds(missing):
+    # A failed render is not kept, so the next rerun tries it again
+    prefetch.add_cloud(snapshot, filters, phrase, False, wordcloud_option, label, image)
+    show_wordcloud(label, image)
 
 # --- Data Preview ---
+@flow.node('snapshot')
+def preview(snapshot):
+    return snapshot.post_texts.attach(expand_posts(snapshot.data.head()))
+
 st.write("## Data Preview")
-st.dataframe(data.head())
+st.dataframe(flow.get('preview'))
 st.write("## Filtered Data for Selected Profiles, Sentiments, Politikfeld, and Emotions")
-st.dataframe(filtered_data)
+# Texts are attached to one page of rows at a time, so a session does not keep every filtered post body
+TABLE_ROWS = 500
+table_pages = max(1, -(-len(flow.get('dated_data')) // TABLE_ROWS))
+table_page = st.number_input(f"Page (of {table_pages}, {TABLE_ROWS} posts each)", min_value=1,
+                             max_value=table_pages, value=1) if table_pages > 1 else 1
+flow.source('table_page', table_page)
+
+@flow.node('snapshot', 'dated_data', 'table_page')
+def filtered_table(snapshot, dated_data, table_page):
+    rows = dated_data.iloc[(table_page - 1) * TABLE_ROWS:table_page * TABLE_ROWS]
+    return snapshot.post_texts.attach(expand_posts(rows.drop(columns='Date')))
+
+st.dataframe(flow.get('filtered_table'))
@@ -1,36 +1,30 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from debrief import config, prefetch
+from debrief.compact import expand_posts
+from debrief.dataflow import session_flow
+from debrief.query import post_query
+from debrief.tags import tag_index
+from debrief.watcher import current_snapshot
+from debrief.wordclouds import iter_wordclouds
 
 st.set_page_config(layout="wide")
 
-# Load the CSV file
+# Use the newest export, ingested in the background; post bodies stay in the memory-mapped text store
+snapshot = current_snapshot()
+if snapshot is None:
+    st.error("No export found in pages/data.")
+    st.stop()
+data, post_texts = snapshot.data, snapshot.post_texts
 
-data = pd.read_csv("pages/data/Jan25-18.02.csv")
-
-# Normalize the sentiment and politikfeld columns by stripping extra quotes and whitespace
-data['sentiment'] = data['sentiment'].str.strip(" '")
-data['politikfeld'] = data['politikfeld'].str.strip(" '")
-data['emotion'] = data['emotion'].str.strip(" '")
-
-
-# Ensure column names are consistent
-data.columns = data.columns.str.strip()
-
-# Preprocess data: convert strings with commas to numeric
-data['Anzahl Likes'] = data['Anzahl Likes'].str.replace(',', '').astype(float)
-data['Anzahl Kommentare'] = data['Anzahl Kommentare'].str.replace(',', '').astype(float)
-data['Reaktionen, Kommentare & Shares'] = data['Reaktionen, Kommentare & Shares'].str.replace(',', '').astype(float)
-data['Post-Interaktionsrate'] = data['Post-Interaktionsrate'].str.replace(',', '.').astype(float)
-
-# Convert 'Datum' to datetime
-data['Datum'] = data['Datum'].str.replace(',', ' ')
-
-data['Datum'] = pd.to_datetime(data['Datum'], format='%d.%m.%y %H:%M', errors='coerce')
+# Everything derived below is a node memoised on its inputs, so a widget change
+# only recomputes the artefacts that depend on it
+flow = session_flow('Instagram 2025')
+flow.source('snapshot', snapshot, key=snapshot.version)
 
 # Streamlit app title
 st.title('Social Media Post Analysis')
+st.caption(f"Export: {snapshot.path}")
 
 # Sidebar for filtering options
 st.sidebar.title("Filter Options")
@@ -39,78 +33,73 @@ st.sidebar.title("Filter Options")
 groups = data['Gruppe'].unique()
 groups_list = st.sidebar.multiselect("Select Group", options=['All'] + list(groups), default=['All'])
 
-# Determine the selected groups
-if 'All' in groups_list:
-    selected_groups = groups
-else:
-    selected_groups = groups_list
 
 # Multiselect for profiles with an 'All' option
 profiles = data['Profil'].unique()
 profiles_list = st.sidebar.multiselect("Select Profiles", options=['All'] + list(profiles), default=['All'])
 
-# Determine the selected profiles
-if 'All' in profiles_list:
-    selected_profiles = profiles
-else:
-    selected_profiles = profiles_list
 
 # Multiselect for sentiments with an 'All' option
 sentiments = data['sentiment'].unique()
 sentiments_list = st.sidebar.multiselect("Select Sentiments", options=['All'] + list(sentiments), default=['All'])
 
-# Determine the selected sentiments
-if 'All' in sentiments_list:
-    selected_sentiments = sentiments
-else:
-    selected_sentiments = sentiments_list
 
 # Multiselect for politikfeld with an 'All' option
 politikfelds = data['politikfeld'].unique()
 politikfeld_list = st.sidebar.multiselect("Select Politikfeld", options=['All'] + list(politikfelds), default=['All'])
 
-# Determine the selected politikfelds
-if 'All' in politikfeld_list:
-    selected_politikfeld = politikfelds
-else:
-    selected_politikfeld = politikfeld_list
 
 # Multiselect for emotion with an 'All' option
 emotions = data['emotion'].unique()
 emotions_list = st.sidebar.multiselect("Select Emotions", options=['All'] + list(emotions), default=['All'])
 
-# Determine the selected emotions
-if 'All' in emotions_list:
-    selected_emotions = emotions
-else:
-    selected_emotions = emotions_list
 
 # Text input for filtering by phrase in 'Text' column
 phrase = st.sidebar.text_input("Enter a phrase to search in Text", value="")
 
-# Filter data based on sidebar selections
-filtered_data = data[
-    (data['Profil'].isin(selected_profiles)) & 
-    (data['sentiment'].isin(selected_sentiments)) &
-    (data['politikfeld'].isin(selected_politikfeld)) &
-    (data['emotion'].isin(selected_emotions)) &
-    (data['Gruppe'].isin(selected_groups))
-]
-
-# Apply text filter if a phrase is entered
-if phrase:
-    filtered_data = filtered_data[filtered_data['Text'].str.contains(phrase, case=False, na=False)]
+# Cross-posted and republished texts count once, as their earliest post
+collapse = st.sidebar.checkbox("Collapse duplicates", value=False,
+                               help="Near-identical posts (e.g. the same text on several profiles) count only once.")
+
+# Filter data based on sidebar selections (columns left at 'All' are not filtered)
+# and the phrase in 'Text'; the query runs on the configured backend
+filters = {
+    column: selection
+    for column, selection in [('Profil', profiles_list), ('sentiment', sentiments_list),
+                              ('politikfeld', politikfeld_list), ('emotion', emotions_list),
+                              ('Gruppe', groups_list)]
+    if 'All' not in selection
+}
+flow.source('filters', filters)
+flow.source('phrase', phrase)
+flow.source('collapse', collapse)
+# Counted towards the filter states the prefetcher warms ahead
+prefetch.observe(filters)
+
+@flow.node('snapshot', 'filters', 'phrase', 'collapse')
+def posts(snapshot, filters, phrase, collapse):
+    return post_query(snapshot, filters, phrase, collapse)
+
+# Shared by all sessions, and often computed ahead by the prefetcher
+@flow.node('snapshot', 'filters', 'phrase', 'collapse')
+def filtered_data(snapshot, filters, phrase, collapse):
+    return prefetch.filtered_data(snapshot, filters, phrase, collapse)
+
+# Categories with enough posts, ranked by the lower bound of the bootstrap interval of their mean
+@flow.node('snapshot', 'filters', 'phrase', 'collapse')
+def performance(snapshot, filters, phrase, collapse):
+    return prefetch.performance(snapshot, filters, phrase, collapse)
+
+filtered_data = flow.get('filtered_data')
 
 #TEST BELOW
-# Ensure that 'Post-Interaktionsrate' is numeric
+# Shown as 'N/A' (without top posts) when no category has enough posts
+best_sentiment = best_emotion = best_politikfeld = "N/A"
 if 'Post-Interaktionsrate' in filtered_data.columns:
-    
-    filtered_data['Post-Interaktionsrate'] = pd.to_numeric(filtered_data['Post-Interaktionsrate'], errors='coerce')
-    
-    # Calculate the average interaction rate per category
-    sentiment_perf = filtered_data.groupby('sentiment')['Post-Interaktionsrate'].mean()
-    emotion_perf = filtered_data.groupby('emotion')['Post-Interaktionsrate'].mean()
-    politikfeld_perf = filtered_data.groupby('politikfeld')['Post-Interaktionsrate'].mean()
+    performance = flow.get('performance')
+    sentiment_perf = performance['sentiment']
+    emotion_perf = performance['emotion']
+    politikfeld_perf = performance['politikfeld']
 
     # Debug: print the indexes so we can see what keys are available
     #st.write("Sentiment groups:", sentiment_perf.index.tolist())
@@ -120,51 +109,56 @@ if 'Post-Interaktionsrate' in filtered_data.columns:
     # Check if the series are non-empty before proceeding
     if not sentiment_perf.empty and not emotion_perf.empty and not politikfeld_perf.empty:
         try:
-            best_sentiment = sentiment_perf.idxmax()
+            best_sentiment = sentiment_perf['lower'].idxmax()
             # Check that the key exists before indexing
             if best_sentiment in sentiment_perf.index:
-                best_sentiment_rate = sentiment_perf.loc[best_sentiment]
+                best_sentiment_rate = sentiment_perf.loc[best_sentiment, 'mean']
+                best_sentiment_lower = sentiment_perf.loc[best_sentiment, 'lower']
             else:
-                best_sentiment_rate = float('nan')
+                best_sentiment_rate = best_sentiment_lower = float('nan')
         except Exception as e:
             best_sentiment = "N/A"
-            best_sentiment_rate = 0
+            best_sentiment_rate = best_sentiment_lower = 0
             st.error(f"Error determining best sentiment: {e}")
 
         try:
-            best_emotion = emotion_perf.idxmax()
+            best_emotion = emotion_perf['lower'].idxmax()
             if best_emotion in emotion_perf.index:
-                best_emotion_rate = emotion_perf.loc[best_emotion]
+                best_emotion_rate = emotion_perf.loc[best_emotion, 'mean']
+                best_emotion_lower = emotion_perf.loc[best_emotion, 'lower']
             else:
-                best_emotion_rate = float('nan')
+                best_emotion_rate = best_emotion_lower = float('nan')
         except Exception as e:
             best_emotion = "N/A"
-            best_emotion_rate = 0
+            best_emotion_rate = best_emotion_lower = 0
             st.error(f"Error determining best emotion: {e}")
 
         try:
-            best_politikfeld = politikfeld_perf.idxmax()
+            best_politikfeld = politikfeld_perf['lower'].idxmax()
             if best_politikfeld in politikfeld_perf.index:
-                best_politikfeld_rate = politikfeld_perf.loc[best_politikfeld]
+                best_politikfeld_rate = politikfeld_perf.loc[best_politikfeld, 'mean']
+                best_politikfeld_lower = politikfeld_perf.loc[best_politikfeld, 'lower']
             else:
-                best_politikfeld_rate = float('nan')
+                best_politikfeld_rate = best_politikfeld_lower = float('nan')
         except Exception as e:
             best_politikfeld = "N/A"
-            best_politikfeld_rate = 0
+            best_politikfeld_rate = best_politikfeld_lower = 0
             st.error(f"Error determining best politikfeld: {e}")
 
         st.markdown(
             f"""
             ### Zusammenfassung:
             Die folgenden Textfelder zeigen automatisch die best performenden Sentimente, Emotionen und Politikfelder in der über die Filter auf der Seitenleiste ausgewählten Gruppen / Parteien. 
+            Bewertet wird die untere Grenze eines 95%-Bootstrap-Konfidenzintervalls der mittleren Interaktionsrate, damit wenige virale Posts eine Kategorie nicht allein nach vorne bringen; Kategorien mit weniger als {config.MIN_SUPPORT} Posts werden nicht gewertet.
             Danach folgen jeweils die drei Posts mit der höchsten Interaktionsrate in den jeweiligen Kategorien. Für einen kompletten Überblick, über die Posts in der gefilterten Gruppe, können die generierten Tabellen weiter unten genutzt werden.
-            - **Sentiment:** {best_sentiment} (Avg. Interaction Rate: {best_sentiment_rate:.2f})
-            - **Emotion:** {best_emotion} (Avg. Interaction Rate: {best_emotion_rate:.2f})
-            - **Politikfeld:** {best_politikfeld} (Avg. Interaction Rate: {best_politikfeld_rate:.2f})
+            - **Sentiment:** {best_sentiment} (Avg. Interaction Rate: {best_sentiment_rate:.2f}, untere 95%-Grenze: {best_sentiment_lower:.2f})
+            - **Emotion:** {best_emotion} (Avg. Interaction Rate: {best_emotion_rate:.2f}, untere 95%-Grenze: {best_emotion_lower:.2f})
+            - **Politikfeld:** {best_politikfeld} (Avg. Interaction Rate: {best_politikfeld_rate:.2f}, untere 95%-Grenze: {best_politikfeld_lower:.2f})
             """
         )
     else:
-        st.info("Not enough data to compute performance metrics for one or more categories.")
+        st.info(f"Not enough data to compute performance metrics for one or more categories "
+                f"(at least {config.MIN_SUPPORT} posts per category are needed).")
 else:
     st.info("The 'Post-Interaktionsrate' column is not available to calculate performance metrics.")
 #TEST ABOVE
@@ -174,17 +168,17 @@ else:
 # (Assuming best_sentiment, best_emotion, best_politikfeld have been computed,
 #  and that filtered_data has been cleaned accordingly)
 
-# For example, ensure that 'Post-Interaktionsrate' is numeric:
-if 'Post-Interaktionsrate' in filtered_data.columns:
-    filtered_data['Post-Interaktionsrate'] = pd.to_numeric(filtered_data['Post-Interaktionsrate'], errors='coerce')
-
 # Compute the top posts for each category
-top_sentiment_posts = filtered_data[filtered_data['sentiment'] == best_sentiment] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
-top_emotion_posts = filtered_data[filtered_data['emotion'] == best_emotion] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
-top_politikfeld_posts = filtered_data[filtered_data['politikfeld'] == best_politikfeld] \
-    .sort_values(by='Post-Interaktionsrate', ascending=False).head(3)
+flow.source('best', {'sentiment': best_sentiment, 'emotion': best_emotion, 'politikfeld': best_politikfeld})
+
+@flow.node('posts', 'best')
+def top_posts(posts, best):
+    return {dimension: posts.top(dimension, value) for dimension, value in best.items()}
+
+top_posts = flow.get('top_posts')
+top_sentiment_posts = top_posts['sentiment']
+top_emotion_posts = top_posts['emotion']
+top_politikfeld_posts = top_posts['politikfeld']
 
 # Create three columns to display the posts side by side
 cols = st.columns(3)
@@ -195,7 +189,7 @@ with cols[0]:
         for _, row in top_sentiment_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this sentiment.")
@@ -206,7 +200,7 @@ with cols[1]:
         for _, row in top_emotion_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this emotion.")
@@ -217,7 +211,7 @@ with cols[2]:
         for _, row in top_politikfeld_posts.iterrows():
             st.markdown(f"*Interaction Rate:* {row['Post-Interaktionsrate']:.2f}")
             st.markdown(f"*Anzahl Likes:* {row['Anzahl Likes']:.2f}")
-            st.write(row['Text'])
+            st.write(post_texts.get(row.name))
             st.write("---")
     else:
         st.write("No posts found for this politikfeld.")
@@ -230,7 +224,18 @@ st.write("Number of rows after filtering:", len(filtered_data))
 # Ensure Datum is correctly parsed and contains no NaT values
 if filtered_data['Datum'].isna().sum() > 0:
     st.write("Warning: Some 'Datum' values could not be parsed. They are excluded from plots.")
-    filtered_data = filtered_data.dropna(subset=['Datum'])
+
+# Everything below only uses the posts with a parseable Datum
+@flow.node('filtered_data')
+def dated_data(filtered_data):
+    return filtered_data.dropna(subset=['Datum'])
+
+# Indexed by Datum for the line charts
+@flow.node('dated_data')
+def plot_data(dated_data):
+    return dated_data.set_index('Datum')
+
+plot_data = flow.get('plot_data')
 
 
 
@@ -244,20 +249,14 @@ col1, col2 = st.columns(2)
 # Show total likes over time in the first column
 with col1:
     st.write("### Likes Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Anzahl Likes'])
+    if not plot_data.empty:
+        st.line_chart(plot_data['Anzahl Likes'])
 
 # Show comments over time in the second column
 with col2:
     st.write("### Comments Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Anzahl Kommentare'])
+    if not plot_data.empty:
+        st.line_chart(plot_data['Anzahl Kommentare'])
 
 # Another row of side-by-side plots
 col3, col4 = st.columns(2)
@@ -265,34 +264,35 @@ col3, col4 = st.columns(2)
 # Show total interactions over time in the first column
 with col3:
     st.write("### Interactions Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Reaktionen, Kommentare & Shares'])
+    if not plot_data.empty:
+        st.line_chart(plot_data['Reaktionen, Kommentare & Shares'])
 
 # Show interaction rate over time in the second column
 with col4:
     st.write("### Interaction Rate Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns and 'Post-Interaktionsrate' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Post-Interaktionsrate'])
+    if not plot_data.empty and 'Post-Interaktionsrate' in plot_data.columns:
+        st.line_chart(plot_data['Post-Interaktionsrate'])
 
 # Additional Visualizations
 
 # Sentiment distribution
 st.write("### Sentiment Distribution")
-sentiment_counts = filtered_data['sentiment'].value_counts()
-st.bar_chart(sentiment_counts)
+@flow.node('dated_data')
+def sentiment_counts(dated_data):
+    return dated_data['sentiment'].value_counts().loc[lambda counts: counts > 0]
+
+st.bar_chart(flow.get('sentiment_counts'))
 
-# Ensure the columns for aggregation are numeric
-numeric_columns = ['Anzahl Likes', 'Anzahl Kommentare', 'Reaktionen, Kommentare & Shares']
-numeric_data = filtered_data[numeric_columns].apply(pd.to_numeric, errors='coerce')
+@flow.node('dated_data')
+def engagement_by_sentiment(dated_data):
+    # Ensure the columns for aggregation are numeric
+    numeric_columns = ['Anzahl Likes', 'Anzahl Kommentare', 'Reaktionen, Kommentare & Shares']
+    numeric_data = dated_data[numeric_columns].apply(pd.to_numeric, errors='coerce')
+    # Adding sentiment back to numeric data for grouping
+    numeric_data['sentiment'] = dated_data['sentiment']
+    return numeric_data.groupby('sentiment', observed=True)[['Anzahl Likes', 'Anzahl Kommentare']].mean()
 
-# Adding sentiment back to numeric data for grouping
-numeric_data['sentiment'] = filtered_data['sentiment']
+engagement = flow.get('engagement_by_sentiment')
 
 # Using columns to display bar charts side-by-side
 col5, col6 = st.columns(2)
@@ -300,60 +300,112 @@ col5, col6 = st.columns(2)
 # Average engagement by sentiment in the first column
 with col5:
     st.write("### Average Likes by Sentiment")
-    average_likes = numeric_data.groupby('sentiment')['Anzahl Likes'].mean()
-    st.bar_chart(average_likes)
+    st.bar_chart(engagement['Anzahl Likes'])
 
 # Average engagement by sentiment in the second column
 with col6:
     st.write("### Average Comments by Sentiment")
-    average_comments = numeric_data.groupby('sentiment')['Anzahl Kommentare'].mean()
-    st.bar_chart(average_comments)
+    st.bar_chart(engagement['Anzahl Kommentare'])
+
+# Hashtags and mentions, from the sparse index built when the export was ingested
+st.write("## Hashtags and Mentions")
+
+st.sidebar.title("Hashtag Options")
+hashtag_group = st.sidebar.selectbox("Top hashtags per", options=['Gruppe', 'Profil'])
+flow.source('hashtag_group', hashtag_group)
+
+@flow.node('snapshot')
+def tags(snapshot):
+    return tag_index(snapshot)
+
+@flow.node('tags', 'dated_data')
+def tag_summary(tags, dated_data):
+    rows = dated_data.index
+    return {
+        'hashtags': tags.hashtags.top(rows, 15),
+        'mentions': tags.mentions.top(rows, 15),
+        'cooccurrence': tags.hashtags.cooccurrence(rows, 15),
+        'engagement': tags.hashtags.mean_engagement(rows, dated_data['Post-Interaktionsrate']).head(15),
+    }
+
+@flow.node('tags', 'dated_data', 'hashtag_group')
+def hashtags_by_group(tags, dated_data, hashtag_group):
+    return tags.hashtags.top_by(dated_data.index, dated_data[hashtag_group].astype(str), 5)
+
+tag_summary = flow.get('tag_summary')
+
+col7, col8 = st.columns(2)
+
+with col7:
+    st.write("### Top Hashtags")
+    st.bar_chart(tag_summary['hashtags'])
+
+with col8:
+    st.write("### Top Mentions")
+    st.bar_chart(tag_summary['mentions'])
+
+st.write(f"### Top Hashtags per {hashtag_group}")
+st.dataframe(flow.get('hashtags_by_group').rename(columns={'group': hashtag_group}), use_container_width=True)
+
+st.write("### Hashtag Co-occurrence (posts using both)")
+st.dataframe(tag_summary['cooccurrence'])
+
+st.write("### Average Interaction Rate per Hashtag (at least 3 posts)")
+st.bar_chart(tag_summary['engagement']['mean'])
 
 # Display the first few rows of the data
+@flow.node('snapshot')
+def preview(snapshot):
+    return snapshot.post_texts.attach(expand_posts(snapshot.data.head()))
+
 st.write("## Data Preview")
-st.dataframe(data.head())
+st.dataframe(flow.get('preview'))
 
 # Display filtered data
 st.write(f"## Filtered Data for Selected Profiles, Sentiments, Politikfeld, and Emotions")
-st.dataframe(filtered_data)
+# Texts are attached to one page of rows at a time, so a session does not keep every filtered post body
+TABLE_ROWS = 500
+table_pages = max(1, -(-len(flow.get('dated_data')) // TABLE_ROWS))
+table_page = st.number_input(f"Page (of {table_pages}, {TABLE_ROWS} posts each)", min_value=1,
+                             max_value=table_pages, value=1) if table_pages > 1 else 1
+flow.source('table_page', table_page)
+
+@flow.node('snapshot', 'dated_data', 'table_page')
+def filtered_table(snapshot, dated_data, table_page):
+    rows = dated_data.iloc[(table_page - 1) * TABLE_ROWS:table_page * TABLE_ROWS]
+    return snapshot.post_texts.attach(expand_posts(rows))
+
+st.dataframe(flow.get('filtered_table'))
 
 # Sidebar selection for word cloud type
 st.sidebar.title("Word Cloud Options")
 wordcloud_option = st.sidebar.selectbox("Select Word Cloud Type", options=['sentiment', 'emotion', 'politikfeld'])
+flow.source('wordcloud_option', wordcloud_option)
 
 # Word Cloud for Text Analysis
 st.write("### Word Cloud for Text Analysis by Selected Type")
 
-# Generate and display word clouds based on the selected option
-if wordcloud_option == 'sentiment':
-    for sentiment in filtered_data['sentiment'].unique():
-        sentiment_text = " ".join(filtered_data[filtered_data['sentiment'] == sentiment]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(sentiment_text)
-        
-        st.write(f"#### Word Cloud for {sentiment} Sentiment")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-        
-elif wordcloud_option == 'emotion':
-    for emotion in filtered_data['emotion'].unique():
-        emotion_text = " ".join(filtered_data[filtered_data['emotion'] == emotion]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(emotion_text)
-        
-        st.write(f"#### Word Cloud for {emotion} Emotion")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
-        
-elif wordcloud_option == 'politikfeld':
-    for politikfeld in filtered_data['politikfeld'].unique():
-        politikfeld_text = " ".join(filtered_data[filtered_data['politikfeld'] == politikfeld]['Text'])
-        wordcloud = WordCloud(width=800, height=400, background_color='white').generate(politikfeld_text)
-        
-        st.write(f"#### Word Cloud for {politikfeld} Politikfeld")
-        plt.figure(figsize=(10, 5))
-        plt.imshow(wordcloud, interpolation='bilinear')
-        plt.axis('off')
-        st.pyplot(plt)
+@flow.node('snapshot', 'dated_data', 'wordcloud_option')
+def cloud_texts(snapshot, dated_data, wordcloud_option):
+    return prefetch.cloud_texts(snapshot, dated_data, wordcloud_option)
+
+cloud_texts = flow.get('cloud_texts')
+# Shared by all sessions: each run shows the ones finished so far, also by other sessions
+cloud_images = prefetch.cloud_images(snapshot, filters, phrase, collapse, wordcloud_option)
+
+def show_wordcloud(label, image):
+    st.write(f"#### Word Cloud for {label} {wordcloud_option.capitalize()}")
+    if image is not None:
+        st.image(image, use_column_width=True)
+    else:
+        st.warning(f"The word cloud for {label} could not be generated.")
+
+for label, image in cloud_images.items():
+    show_wordcloud(label, image)
+
+# Generate the missing word clouds in parallel and show each one as soon as it is ready
+missing = {label: text for label, text in cloud_texts.items() if label not in cloud_images}
+for label, image in iter_wordclouds(missing):
+    # A failed render is not kept, so the next rerun tries it again
+    prefetch.add_cloud(snapshot, filters, phrase, collapse, wordcloud_option, label, image)
+    show_wordcloud(label, image)
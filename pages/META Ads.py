@@ -1,16 +1,14 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
+from debrief.loader import data_version, load_ads
+from debrief.query import ad_query
 
-# Load the new CSV file
-new_data = pd.read_csv("pages/data/all_meta_ads.csv")
+# Load the new CSV file once per server (shared across processes in shared mode)
+@st.cache_resource(max_entries=2)
+def load_data(path, version):
+    return load_ads(path)
 
-# Preprocess the new data
-new_data.columns = new_data.columns.str.strip()
-
-# Convert reporting dates to datetime
-new_data['Reporting starts'] = pd.to_datetime(new_data['Reporting starts'])
-new_data['Reporting ends'] = pd.to_datetime(new_data['Reporting ends'])
+data_path = "pages/data/all_meta_ads.csv"
+new_data = load_data(data_path, data_version(data_path))
 
 # Streamlit app title for the new page
 st.title('Ad Campaign Analysis')
@@ -31,31 +29,20 @@ date1_end = st.sidebar.date_input("Select End Date 1", value=new_data['Reporting
 date2_start = st.sidebar.date_input("Select Start Date 2", value=new_data['Reporting starts'].min(), key='date2_start')
 date2_end = st.sidebar.date_input("Select End Date 2", value=new_data['Reporting ends'].max(), key='date2_end')
 
-# Apply filters
-if 'All' in selected_campaigns:
-    selected_campaigns = campaign_names
-if 'All' in selected_ad_sets:
-    selected_ad_sets = ad_set_names
-if 'All' in selected_ads:
-    selected_ads = ad_names
-
-filtered_new_data = new_data[
-    new_data['Campaign name'].isin(selected_campaigns) & 
-    new_data['Ad Set Name'].isin(selected_ad_sets) & 
-    new_data['Ad name'].isin(selected_ads)
-]
-
-# Filter data by selected date ranges
-data_date1 = filtered_new_data[(filtered_new_data['Reporting starts'] >= pd.to_datetime(date1_start)) & 
-                               (filtered_new_data['Reporting ends'] <= pd.to_datetime(date1_end))]
-
-data_date2 = filtered_new_data[(filtered_new_data['Reporting starts'] >= pd.to_datetime(date2_start)) & 
-                               (filtered_new_data['Reporting ends'] <= pd.to_datetime(date2_end))]
-
-
-
-
-
+# Apply filters (columns left at 'All' are not filtered)
+filters = {
+    column: selection
+    for column, selection in [('Campaign name', selected_campaigns), ('Ad Set Name', selected_ad_sets),
+                              ('Ad name', selected_ads)]
+    if 'All' not in selection
+}
+ads = ad_query(data_path, new_data, filters)
+
+# Filter data by selected date ranges, reading only the columns the charts use
+chart_columns = ['Reporting starts', 'Ad name', 'Amount spent (EUR)', 'Results', 'Impressions', 'Reach',
+                 'Cost per result', 'CPM (cost per 1,000 impressions)', 'CTR (all)', 'ThruPlays']
+data_date1 = ads.frame(date1_start, date1_end, chart_columns)
+data_date2 = ads.frame(date2_start, date2_end, chart_columns)
 
 # Display data for date range 1
 st.write(f"### Performance from {date1_start} to {date1_end}")
@@ -82,7 +69,7 @@ if not data_date1.empty:
 
     # Top Performing Ads
     st.write("### Top Performing Ads (Results)")
-    top_ads_date1 = data_date1.nlargest(10, 'Results')
+    top_ads_date1 = ads.top('Results', 10, date1_start, date1_end, ['Ad name', 'Results'])
     st.bar_chart(top_ads_date1.set_index('Ad name')['Results'])
 
 # Display data for date range 2
@@ -110,5 +97,5 @@ if not data_date2.empty:
 
     # Top Performing Ads
     st.write("### Top Performing Ads (Results)")
-    top_ads_date2 = data_date2.nlargest(10, 'Results')
+    top_ads_date2 = ads.top('Results', 10, date2_start, date2_end, ['Ad name', 'Results'])
     st.bar_chart(top_ads_date2.set_index('Ad name')['Results'])
@@ -0,0 +1,105 @@
+import streamlit as st
+import pandas as pd
+from debrief import charts
+from debrief.dataflow import session_flow
+from debrief.similarity import similarity_index
+from debrief.watcher import current_snapshot
+
+st.set_page_config(layout="wide")
+
+# Newest export; the TF-IDF index per Profil and Partei is built while it is ingested
+snapshot = current_snapshot()
+if snapshot is None:
+    st.error("No export found in pages/data.")
+    st.stop()
+data = snapshot.data
+
+flow = session_flow('Profile Similarity')
+flow.source('snapshot', snapshot, key=snapshot.version)
+
+# Streamlit app title
+st.title('Profile Similarity')
+st.caption(f"Export: {snapshot.path}")
+st.markdown(
+    """
+    Wie ähnlich sind sich die Themen der Profile und Parteien? Für jedes Profil (bzw. jede Partei) werden die Wörter
+    aller Posts zu einem TF-IDF-Vektor zusammengefasst; die Heatmap zeigt die Kosinus-Ähnlichkeit dieser Vektoren
+    (0 = keine gemeinsamen Begriffe, 1 = gleiche Wortverteilung).
+    """
+)
+
+# Sidebar for the comparison options
+st.sidebar.title("Similarity Options")
+compare = st.sidebar.selectbox("Compare", options=['Profil', 'Partei'])
+
+# Multiselect for groups with an 'All' option
+groups = data['Gruppe'].unique()
+groups_list = st.sidebar.multiselect("Select Group", options=['All'] + list(groups), default=['All'])
+
+# Hundreds of profiles do not fit into one heatmap; show the ones with the most posts
+limit = st.sidebar.slider("Show the most active", min_value=5, max_value=200, value=40)
+
+flow.source('compare', compare)
+flow.source('groups', groups_list)
+flow.source('limit', limit)
+
+@flow.node('snapshot', 'compare', 'groups', 'limit')
+def members(snapshot, compare, groups, limit):
+    posts = snapshot.data if 'All' in groups else snapshot.data[snapshot.data['Gruppe'].isin(groups)]
+    return posts[compare].value_counts().loc[lambda counts: counts > 0].head(limit).index.tolist()
+
+@flow.node('snapshot', 'compare')
+def index(snapshot, compare):
+    return similarity_index(snapshot, compare)
+
+@flow.node('index', 'members')
+def matrix(index, members):
+    return index.similarity(members)
+
+members = flow.get('members')
+if not members:
+    st.info("No posts in the selected groups.")
+    st.stop()
+
+st.write(f"## Content Similarity per {compare}")
+chart_key = (charts.filter_hash(compare, groups_list, limit), snapshot.version)
+charts.plotly_chart('similarity', chart_key, lambda: charts.heatmap(
+    flow.get('matrix'),
+    title=f"Cosine Similarity of the TF-IDF Vectors ({len(members)} {compare})",
+    labels={'x': compare, 'y': compare, 'color': 'Similarity'}
+).update_layout(height=max(500, 18 * len(members))))
+
+# Nearest neighbours of one profile or party among all of them, not only the ones shown
+st.write("## Most Similar to")
+selected = st.selectbox(f"Select {compare}", options=members)
+flow.source('selected', selected)
+
+@flow.node('index', 'selected')
+def neighbours(index, selected):
+    top = index.nearest(selected, 10)
+    posts = pd.Series(index.posts, index=index.groups)
+    return pd.DataFrame({'Similarity': top, 'Posts': posts.reindex(top.index)})
+
+neighbours = flow.get('neighbours')
+col1, col2 = st.columns(2)
+
+with col1:
+    st.write(f"### Nearest {compare}")
+    st.dataframe(neighbours, use_container_width=True,
+                 column_config={'Similarity': st.column_config.NumberColumn(format='%.3f')})
+
+with col2:
+    if not neighbours.empty:
+        closest = neighbours.index[0]
+        st.write(f"### Shared Terms with {closest}")
+        shared = flow.get('index').shared_terms(selected, closest).rename_axis('term').reset_index()
+        if not shared.empty:
+            charts.plotly_chart('shared_terms', (*chart_key, selected), lambda: charts.bar(
+                shared,
+                x='term',
+                y='weight',
+                title="Terms Contributing Most to the Similarity",
+                labels={'term': 'Term', 'weight': 'Contribution'}
+            ))
+        else:
+            st.write("No shared terms.")
@@ -1,31 +1,46 @@
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from wordcloud import WordCloud
+from debrief.social_media import (METRICS, RATE, UNDATED, ensure_store, partitions, read_rows, read_summary,
+                                  source_version, summarize)
 
-# Load the CSV file
+# Rebuild the partitioned store whenever all_content.csv changes
+@st.cache_resource(max_entries=1)
+def load_store(version):
+    return ensure_store()
 
-data = pd.read_csv("pages/data/all_content.csv")
+# Profiles of all partitions for the sidebar, reading only that column
+@st.cache_data(max_entries=1)
+def load_profiles(store_version, platforms, years):
+    return read_summary(platforms, years, ['Profil'])['Profil'].dropna().unique()
 
-# Ensure column names are consistent
-data.columns = data.columns.str.strip()
+# Per-day summaries of the selected partitions only; small enough to keep around for every platform choice
+@st.cache_data(max_entries=32)
+def load_summary(store_version, platforms, years):
+    return read_summary(platforms, years)
 
-# Preprocess data: convert strings with commas to numeric
-data['Anzahl Likes'] = data['Anzahl Likes'].str.replace(',', '').astype(float)
-data['Anzahl Kommentare'] = data['Anzahl Kommentare'].str.replace(',', '').astype(float)
-data['Gesamtanzahl Reaktionen, Kommentare & Shares'] = data['Gesamtanzahl Reaktionen, Kommentare & Shares'].str.replace(',', '').astype(float)
+# Posts of the selected partitions, only needed to search the message text
+@st.cache_data(max_entries=8)
+def load_rows(store_version, platforms, years):
+    return read_rows(platforms, years)
 
-# Convert 'Datum' to datetime
-data['Datum'] = pd.to_datetime(data['Datum'], format='%d.%m.%y, %H:%M', errors='coerce')
+store_version = load_store(source_version())
 
 # Streamlit app title
 st.title('Social Media Overview')
 
+available = partitions()
+if not available:
+    st.info("No social media export found. Place all_content.csv from processing.ipynb in pages/data.")
+    st.stop()
+
 # Sidebar for filtering options
 st.sidebar.title("Filter Options")
 
+# Platforms come from the partition directories without reading any data
+platforms = sorted({platform for platform, _ in available})
+years = sorted({year for _, year in available})
+
 # Multiselect for profiles with an 'All' option
-profiles = data['Profil'].unique()
+profiles = load_profiles(store_version, tuple(platforms), tuple(years))
 profiles_list = st.sidebar.multiselect("Select Profiles", options=['All'] + list(profiles), default=['All'])
 
 # Determine the selected profiles
@@ -35,10 +50,9 @@ else:
     selected_profiles = profiles_list
 
 # Multiselect for platforms with an 'All' option
-platforms = data['Platform'].unique()
-platforms_list = st.sidebar.multiselect("Select Platforms", options=['All'] + list(platforms), default=['All'])
+platforms_list = st.sidebar.multiselect("Select Platforms", options=['All'] + platforms, default=['All'])
 
-# Determine the selected profiles
+# Determine the selected platforms
 if 'All' in platforms_list:
     selected_platforms = platforms
 else:
@@ -47,26 +61,30 @@ else:
 # Text input for filtering by phrase in 'Text' column
 phrase = st.sidebar.text_input("Enter a phrase to search in Text", value="")
 
-# Filter data based on sidebar selections
-filtered_data = data[
-    (data['Profil'].isin(selected_profiles)) & 
-    (data['Platform'].isin(selected_platforms))
-]
+selected_years = tuple(sorted({year for platform, year in available if platform in selected_platforms}))
 
-# Apply text filter if a phrase is entered
 if phrase:
-    filtered_data = filtered_data[filtered_data['Nachricht'].str.contains(phrase, case=False, na=False)]
+    # Searching the messages needs the posts themselves, but only from the selected platforms
+    rows = load_rows(store_version, tuple(selected_platforms), selected_years)
+    rows = rows[rows['Profil'].isin(selected_profiles)]
+    rows = rows[rows['Nachricht'].str.contains(phrase, case=False, na=False)]
+    daily = summarize(rows)
+else:
+    # Only the partitions of the selected platforms are read
+    summary = load_summary(store_version, tuple(selected_platforms), selected_years)
+    daily = summary[summary['Profil'].isin(selected_profiles)]
 
 # Debugging: Show the count of filtered rows
-st.write("Number of rows after filtering:", len(filtered_data))
+st.write("Number of rows after filtering:", int(daily['posts'].sum()))
 
-# Ensure Datum is correctly parsed and contains no NaT values
-if filtered_data['Datum'].isna().sum() > 0:
+# Posts without a parseable Datum are kept in the year=0 partitions
+if (daily['year'] == UNDATED).any():
     st.write("Warning: Some 'Datum' values could not be parsed. They are excluded from plots.")
-    filtered_data = filtered_data.dropna(subset=['Datum'])
+    daily = daily[daily['year'] != UNDATED]
 
-# Sort data by 'Datum'
-filtered_data = filtered_data.sort_values(by='Datum')
+# Daily totals over the selected platforms and profiles
+totals = daily.groupby('Day')[['posts', *METRICS, RATE, 'rate_posts']].sum(min_count=1).sort_index()
+totals[RATE] = totals[RATE] / totals['rate_posts']
 
 # Visualizations
 st.write("## Visualizations")
@@ -77,20 +95,14 @@ col1, col2 = st.columns(2)
 # Show total likes over time in the first column
 with col1:
     st.write("### Likes Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Anzahl Likes'])
+    if not totals.empty:
+        st.line_chart(totals['Anzahl Likes'])
 
 # Show comments over time in the second column
 with col2:
     st.write("### Comments Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Anzahl Kommentare'])
+    if not totals.empty:
+        st.line_chart(totals['Anzahl Kommentare'])
 
 # Another row of side-by-side plots
 col3, col4 = st.columns(2)
@@ -98,17 +110,11 @@ col3, col4 = st.columns(2)
 # Show total interactions over time in the first column
 with col3:
     st.write("### Interactions Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Gesamtanzahl Reaktionen, Kommentare & Shares'])
+    if not totals.empty:
+        st.line_chart(totals['Gesamtanzahl Reaktionen, Kommentare & Shares'])
 
-# Show interaction rate over time in the second column
+# Show the average interaction rate per day in the second column
 with col4:
     st.write("### Interaction Rate Over Time")
-    if not filtered_data.empty and 'Datum' in filtered_data.columns and 'Post-Interaktionsrate' in filtered_data.columns:
-        # Make a copy to avoid modifying the original DataFrame
-        temp_data = filtered_data.copy()
-        temp_data.set_index('Datum', inplace=True)
-        st.line_chart(temp_data['Post-Interaktionsrate'])
\ No newline at end of file
+    if not totals.empty and totals[RATE].notna().any():
+        st.line_chart(totals[RATE])
@@ -0,0 +1,10 @@
+import numpy as np
+
+from debrief.tags import HASHTAG, TagMatrix
+
+
+def test_mean_engagement_leaves_out_posts_without_a_value():
+    tags = TagMatrix.extract(['#a #b', '#a', '#a #b', '#b', '#a'], HASHTAG, '#')
+    means = tags.mean_engagement(np.arange(5), [1.0, np.nan, 3.0, 5.0, 2.0], min_posts=1)
+    assert means.loc['#a', 'posts'] == 3 and means.loc['#a', 'mean'] == 2.0
+    assert means.loc['#b', 'posts'] == 3 and means.loc['#b', 'mean'] == 3.0
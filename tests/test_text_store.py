@@ -0,0 +1,32 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from debrief.text_store import TextStore
+
+
+def _build(path, word, count):
+    TextStore.build([f"{word} {i}" for i in range(count)], path)
+
+
+def test_build_and_read(tmp_path):
+    store = TextStore.build(['eins', None, 'drei ä'], str(tmp_path / 'posts-text'))
+    assert len(store) == 3
+    assert store.get_many([0, 1, 2]) == ['eins', '', 'drei ä']
+
+
+def test_concurrent_builds_publish_matching_offsets_and_blob(tmp_path):
+    path = str(tmp_path / 'posts-text')
+    with ProcessPoolExecutor(4) as pool:
+        list(pool.map(_build, [path] * 8, [f"text{n}" * (n + 1) for n in range(8)], range(100, 108)))
+    store = TextStore(path)
+    word = store.get(0).split()[0]
+    assert store.get_many(range(len(store))) == [f"{word} {i}" for i in range(len(store))]
+
+
+def test_rebuild_removes_the_replaced_blob(tmp_path):
+    path = str(tmp_path / 'posts-text')
+    old = TextStore.build(['alt'], path)
+    new = TextStore.build(['neu', 'zwei'], path)
+    assert [name for name in os.listdir(tmp_path) if name.endswith('.blob')] == [os.path.basename(new.blob.filename)]
+    # Mappings opened before the rebuild stay readable
+    assert old.get(0) == 'alt' and new.get_many([0, 1]) == ['neu', 'zwei']
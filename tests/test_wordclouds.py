@@ -0,0 +1,20 @@
+import multiprocessing
+
+from debrief import wordclouds
+
+
+def test_timeout_yields_none_and_discards_the_pool():
+    texts = {'a': 'hello world ' * 50000}
+    assert list(wordclouds.iter_wordclouds(texts, max_workers=1, timeout=0.01, pool='test')) == [('a', None)]
+    assert 'test' not in wordclouds._pools
+
+
+def test_pool_after_a_timeout_renders_again():
+    list(wordclouds.iter_wordclouds({'a': 'hello world ' * 50000}, max_workers=1, timeout=0.01, pool='test'))
+    [(label, image)] = wordclouds.iter_wordclouds({'b': 'klima europa wahl'}, max_workers=1, timeout=60, pool='test')
+    assert label == 'b' and image.shape == (400, 800, 3)
+
+
+def test_timeout_stops_the_stuck_render():
+    list(wordclouds.iter_wordclouds({'a': 'hello world ' * 50000}, max_workers=1, timeout=0.01, pool='test'))
+    assert not multiprocessing.active_children()
@@ -0,0 +1,123 @@
+"""Check that no page imports more, or takes longer to first render, than its budget on a cold start.
+
+Each page is run once with ``streamlit.testing`` in a fresh interpreter started
+with ``-X importtime``. Streamlit, the test harness and pandas, which every page
+needs, are imported before the page runs, so the time counted is what the page
+itself adds: its own imports, whatever they pull in and what Streamlit loads for
+the elements it draws. Imports in worker processes (the word clouds) do not
+count. The first run, from loading the export to the last element drawn, is
+timed against a budget of its own. Exits non-zero if a page is over either
+budget, or if its interpreter crashed, as its imports would only be counted up
+to the crash::
+
+    python tools/import_budget.py
+    python tools/import_budget.py "pages/META Ads.py"
+"""
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Milliseconds of imports a page may add on top of the harness; wordcloud and matplotlib
+# on the request path do not fit
+BUDGETS_MS = {
+    'Homepage.py': 50,
+    'pages/Google and YouTube Ads.py': 150,
+    'pages/Instagram 2024.py': 150,
+    # Plotly, imported once the summary is on screen
+    'pages/Instagram 2025 - Bessere Visualisierungen.py': 450,
+    # Altair for st.line_chart and st.bar_chart
+    'pages/Instagram 2025.py': 500,
+    'pages/META Ads.py': 500,
+    # Plotly for the heatmap
+    'pages/Profile Similarity.py': 450,
+    'pages/Social Media Overview.py': 150,
+}
+DEFAULT_BUDGET_MS = 150
+
+# Seconds for the cold first run, export and ingest hooks included
+FIRST_RUN_BUDGETS_S = {
+    # The similarity index and rolling sums are built on ingest, the word clouds rendered
+    'pages/Instagram 2025 - Bessere Visualisierungen.py': 10,
+    'pages/Instagram 2025.py': 10,
+    'pages/Engagement Anomalies.py': 3,
+    'pages/META Ads.py': 3,
+    'pages/Profile Similarity.py': 3,
+}
+DEFAULT_FIRST_RUN_BUDGET_S = 1
+
+MARKER = 'import-budget: page starts'
+
+# Runs in the child; the marker separates the harness imports from the page's
+CHILD = f"""
+import json, os, sys, time
+import pandas
+from streamlit.testing.v1 import AppTest
+# Forked workers inherit -X importtime; keep their imports out of the count
+os.register_at_fork(after_in_child=lambda: os.dup2(os.open(os.devnull, os.O_WRONLY), 2))
+sys.stderr.write({MARKER!r} + '\\n')
+sys.stderr.flush()
+started = time.perf_counter()
+at = AppTest.from_file(sys.argv[1], default_timeout=600).run()
+print(json.dumps({{'seconds': time.perf_counter() - started, 'exception': bool(at.exception)}}))
+"""
+
+
+def page_imports_ms(stderr):
+    """Cumulative microseconds of the top-level imports after the marker, in ms."""
+    total = 0
+    lines = stderr.splitlines()
+    start = lines.index(MARKER) + 1 if MARKER in lines else len(lines)
+    for line in lines[start:]:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented and already part of their parent's cumulative time
+        if not name[1:].startswith(' '):
+            total += int(cumulative)
+    return total / 1000
+
+
+def measure(page):
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD, page],
+                            cwd=ROOT, capture_output=True, text=True,
+                            env={**os.environ, 'PYTHONPATH': ROOT})
+    run = json.loads(result.stdout.strip().splitlines()[-1]) if result.returncode == 0 else None
+    return page_imports_ms(result.stderr), run
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pages', nargs='*', help="pages to check (default: all)")
+    args = parser.parse_args(argv)
+
+    pages = args.pages or ['Homepage.py', *sorted(os.path.relpath(path, ROOT)
+                                                  for path in glob.glob(os.path.join(ROOT, 'pages', '*.py')))]
+    over, failed = [], []
+    print(f"{'page':<55} {'imports':>9} {'budget':>8} {'first run':>10} {'budget':>7}")
+    for page in pages:
+        imports_ms, run = measure(page)
+        budget = BUDGETS_MS.get(page, DEFAULT_BUDGET_MS)
+        run_budget = FIRST_RUN_BUDGETS_S.get(page, DEFAULT_FIRST_RUN_BUDGET_S)
+        first_run = f"{run['seconds']:.2f}s" if run else 'failed'
+        if run and run['exception']:
+            first_run += '*'
+        print(f"{page:<55} {imports_ms:>7.0f}ms {budget:>6}ms {first_run:>10} {run_budget:>6}s")
+        if run is None:
+            failed.append(page)
+        elif imports_ms > budget or run['seconds'] > run_budget:
+            over.append(page)
+    print("* the page raised (e.g. a missing data file); its imports up to that point are counted")
+    if failed:
+        print(f"Crashed: {', '.join(failed)}", file=sys.stderr)
+    if over:
+        print(f"Over budget: {', '.join(over)}", file=sys.stderr)
+    return 1 if over or failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+"""Simulate concurrent sessions against the pages and report rerun latency.
+
+Every simulated session is a ``streamlit.testing`` AppTest of one page, run in its
+own thread of this process. Sessions share what a single server process shares:
+the snapshot watcher, ``st.cache_resource`` and ``st.cache_data`` and the
+word-cloud pool. Each session loads its page and then performs a random mix of
+interactions on the sidebar widgets: filter changes, phrase searches and toggles
+(word-cloud type, collapse duplicates, hashtag grouping). Every interaction is
+one rerun, and its wall time is a latency sample::
+
+    python tools/loadtest.py
+    python tools/loadtest.py --sessions 1 8 32 --actions 20 --pages "pages/Instagram 2025.py"
+
+Per concurrency level the report gives throughput (reruns per second), p50, p95
+and p99 latency, the resident memory of the process before and after the level
+and the highest one sampled while it ran, and the errors: exceptions a page
+raised on any run, including the first load, and exceptions in the session
+threads themselves. A server is simulated in-process only; the numbers cover
+the Python side of a rerun, not the websocket or the browser.
+"""
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from unittest.mock import MagicMock  # noqa: E402
+
+from streamlit.runtime import Runtime  # noqa: E402
+from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager  # noqa: E402
+from streamlit.runtime.media_file_manager import MediaFileManager  # noqa: E402
+from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage  # noqa: E402
+from streamlit.testing.v1 import AppTest  # noqa: E402
+
+DEFAULT_PAGES = ['pages/Instagram 2025.py', 'pages/META Ads.py']
+PHRASES = ['', '', 'klima', 'europa', 'wahl', 'migration', 'rente', 'volt']
+# Relative weight of each kind of interaction
+MIX = {'filter': 5, 'search': 3, 'toggle': 2}
+# Seconds between the resident-memory samples of a level
+RSS_INTERVAL = 0.1
+
+
+def rss_mib():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+
+
+class RssSampler:
+    """Highest resident memory of the process while it runs, sampled every ``interval`` seconds."""
+
+    def __init__(self, interval=RSS_INTERVAL):
+        self.interval = interval
+        self.peak = rss_mib()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='rss-sampler', daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, rss_mib())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, rss_mib())
+
+
+def share_runtime():
+    """Give all sessions the one runtime a server process has.
+
+    ``AppTest.run`` installs a runtime of its own and removes it when the run is
+    over, which pulls it away from every other session still running.
+    """
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage('/mock/media'))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    Runtime.instance = classmethod(lambda cls: runtime)
+    Runtime.exists = classmethod(lambda cls: True)
+
+
+def _interact(at, rng):
+    """Change one sidebar widget of ``at`` the way a colleague would."""
+    kind = rng.choices(list(MIX), weights=list(MIX.values()))[0]
+    if kind == 'filter' and at.sidebar.multiselect:
+        widget = rng.choice(list(at.sidebar.multiselect))
+        options = [option for option in widget.options if option != 'All']
+        if options and rng.random() < 0.7:
+            widget.set_value(rng.sample(options, min(len(options), rng.randint(1, 2))))
+        else:
+            widget.set_value(['All'])
+    elif kind == 'search' and at.sidebar.text_input:
+        at.sidebar.text_input[0].set_value(rng.choice(PHRASES))
+    elif at.sidebar.selectbox or at.sidebar.checkbox:
+        toggles = [*at.sidebar.selectbox, *at.sidebar.checkbox]
+        widget = rng.choice(toggles)
+        if hasattr(widget, 'options'):
+            widget.set_value(rng.choice(widget.options))
+        else:
+            widget.set_value(not widget.value)
+    return kind
+
+
+def _session(page, actions, seed, samples, errors, timeout):
+    rng = random.Random(seed)
+    kind = 'load'
+    try:
+        at = AppTest.from_file(os.path.join(ROOT, page), default_timeout=timeout)
+        started = time.perf_counter()
+        at.run()
+        samples.append((page, kind, time.perf_counter() - started))
+        if at.exception:
+            errors.append((page, kind, at.exception[0].message))
+        for _ in range(actions):
+            kind = _interact(at, rng)
+            started = time.perf_counter()
+            at.run()
+            samples.append((page, kind, time.perf_counter() - started))
+            if at.exception:
+                errors.append((page, kind, at.exception[0].message))
+    except Exception as error:
+        # E.g. a rerun timing out, or a widget the interaction expected missing
+        errors.append((page, kind, f"{type(error).__name__}: {error}"))
+
+
+def run_level(pages, sessions, actions, seed, timeout):
+    samples, errors = [], []
+    threads = [
+        threading.Thread(target=_session, name=f"session-{index}",
+                         args=(pages[index % len(pages)], actions, seed + index, samples, errors, timeout))
+        for index in range(sessions)
+    ]
+    rss_before = rss_mib()
+    started = time.perf_counter()
+    with RssSampler() as sampler:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    elapsed = time.perf_counter() - started
+    return samples, errors, elapsed, rss_before, rss_mib(), sampler.peak
+
+
+def report(sessions, samples, errors, elapsed, rss_before, rss_after, rss_peak):
+    latencies = np.array([seconds for _, _, seconds in samples]) * 1000
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99]) if len(latencies) else (float('nan'),) * 3
+    print(f"{sessions:>8} {len(samples):>7} {len(samples) / elapsed:>9.2f} {p50:>8.0f} {p95:>8.0f} {p99:>8.0f} "
+          f"{rss_before:>8.0f} {rss_after:>8.0f} {rss_peak:>8.0f} {len(errors):>6}")
+    for page, kind, message in errors[:3]:
+        print(f"         error after {kind} on {page}: {message}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 4, 16],
+                        help="concurrency levels to run, one after the other")
+    parser.add_argument('--actions', type=int, default=10, help="interactions per session after the first load")
+    parser.add_argument('--pages', nargs='+', default=DEFAULT_PAGES, help="pages the sessions are spread over")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--timeout', type=float, default=600, help="seconds a single rerun may take")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    share_runtime()
+    print(f"{'sessions':>8} {'reruns':>7} {'reruns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'RSS MiB':>8} {'after':>8} {'peak':>8} {'errors':>6}")
+    failed = False
+    for sessions in args.sessions:
+        samples, errors, elapsed, *rss = run_level(args.pages, sessions, args.actions, args.seed, args.timeout)
+        report(sessions, samples, errors, elapsed, *rss)
+        failed = failed or bool(errors)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())